@@ -0,0 +1,191 @@
+'''
+Benchmark dos três leitores sobre PDFs CID sintéticos.
+
+Mede separadamente read_pdf, compile_tables e a gravação do Excel,
+registrando páginas/s, linhas/s e pico de RSS. Cada leitor roda em um
+subprocesso próprio, para o pico de memória ser só dele. Compara com o
+baseline da máquina em benchmarks/baselines.json (versionado; uma
+entrada por máquina, gravada com --update-baseline) e sai com código 1
+se algo piorar além da tolerância, ou 2 se a máquina não tem baseline
+com os mesmos parâmetros.
+
+    python benchmarks/bench.py --docs 30 --tolerance 0.2
+    python benchmarks/bench.py --update-baseline   # e versionar baselines.json
+'''
+import os
+import sys
+import copy
+import glob
+import json
+import time
+import argparse
+import platform
+import tempfile
+import importlib
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+from synthetic_cid import generate_corpus  # noqa: E402
+
+VARIANTS = ('pdf_reader_igor_done', 'pdf_reader_igor_test', 'pdf_reader_vincente_test')
+# métricas onde maior é melhor / menor é melhor
+HIGHER_BETTER = ('pages_per_s', 'rows_per_s', 'write_rows_per_s')
+LOWER_BETTER = ('peak_rss_mb',)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return round(peak / (2**20 if sys.platform == 'darwin' else 2**10), 1)
+
+
+def run_variant(module_name, corpus, repeat=1):
+    '''
+    Roda um leitor sobre o corpus e devolve as métricas (melhor de repeat).
+    '''
+    import pdfplumber
+    from pdf_extract import PROFILE_TABLES
+    from pdf_sinks import Output, XlsxSink
+
+    mod = importlib.import_module(module_name)
+    dedupe = getattr(mod, 'deduplicate_columns', None)
+    pdfs = sorted(glob.glob(os.path.join(corpus, '*.pdf')))
+    pages = 0
+    for p in pdfs:
+        with pdfplumber.open(p) as pdf:
+            pages += len(pdf.pages)
+    best = {}
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        tables = [mod.read_pdf(p, profile=PROFILE_TABLES)[1] for p in pdfs]
+        t_read = time.perf_counter() - t0
+        # compile_tables de alguns leitores altera as tabelas recebidas
+        inputs = copy.deepcopy(tables)
+        t0 = time.perf_counter()
+        frames = [mod.compile_tables(t) for t in inputs]
+        t_compile = time.perf_counter() - t0
+        rows = sum(df.shape[0] for df in frames)
+        with tempfile.TemporaryDirectory() as tmp:
+            t0 = time.perf_counter()
+            output = Output([XlsxSink(os.path.join(tmp, 'bench.xlsx'))], dedupe=dedupe)
+            for p, df in zip(pdfs, frames):
+                if not df.empty:
+                    df.insert(0, 'source_pdf', os.path.basename(p))
+                output.write(df)
+            output.close()
+            t_write = time.perf_counter() - t0
+        for k, v in (('read_s', t_read), ('compile_s', t_compile), ('write_s', t_write)):
+            best[k] = min(best.get(k, v), v)
+    return {
+        'pdfs': len(pdfs),
+        'pages': pages,
+        'rows': rows,
+        'read_s': round(best['read_s'], 4),
+        'compile_s': round(best['compile_s'], 4),
+        'write_s': round(best['write_s'], 4),
+        'pages_per_s': round(pages / best['read_s'], 2),
+        'rows_per_s': round(rows / best['compile_s'], 2) if best['compile_s'] else None,
+        'write_rows_per_s': round(rows / best['write_s'], 2) if best['write_s'] else None,
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def machine_id():
+    '''
+    Chave do baseline: SO, arquitetura, CPUs e versão do Python, o que
+    muda os tempos de uma máquina para outra.
+    '''
+    return (f'{platform.system()}-{platform.machine()}-{os.cpu_count()}cpu-'
+            f'py{sys.version_info[0]}.{sys.version_info[1]}')
+
+
+def compare(results, baseline, tolerance):
+    '''
+    Lista as regressões em relação ao baseline.
+    '''
+    problems = []
+    for variant, metrics in results.items():
+        base = baseline.get(variant, {})
+        for k in HIGHER_BETTER:
+            if base.get(k) and metrics.get(k) is not None and metrics[k] < base[k] * (1 - tolerance):
+                problems.append(f'{variant}: {k} {metrics[k]} < baseline {base[k]}')
+        for k in LOWER_BETTER:
+            if base.get(k) and metrics.get(k) is not None and metrics[k] > base[k] * (1 + tolerance):
+                problems.append(f'{variant}: {k} {metrics[k]} > baseline {base[k]}')
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark dos leitores de PDF CID.')
+    parser.add_argument('--docs', type=int, default=20, help='PDFs sintéticos no corpus')
+    parser.add_argument('--max-pages', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help='repetições (vale a melhor)')
+    parser.add_argument('--variants', default=','.join(VARIANTS))
+    parser.add_argument('--baseline', default=os.path.join(HERE, 'baselines.json'),
+                        help='arquivo com os baselines por máquina')
+    parser.add_argument('--machine', default=machine_id(),
+                        help='entrada do baseline a usar (padrão: %(default)s)')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='piora relativa aceita antes de falhar')
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--variant', help=argparse.SUPPRESS)
+    parser.add_argument('--corpus', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.variant:
+        # modo filho: um leitor, resultado em JSON no stdout
+        print(json.dumps(run_variant(args.variant, args.corpus, args.repeat)))
+        return 0
+
+    params = {'docs': args.docs, 'max_pages': args.max_pages, 'seed': args.seed}
+    results = {}
+    with tempfile.TemporaryDirectory() as corpus:
+        generate_corpus(corpus, n_docs=args.docs, pages=(1, args.max_pages), seed=args.seed)
+        for variant in args.variants.split(','):
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--variant', variant,
+                 '--corpus', corpus, '--repeat', str(args.repeat)],
+                check=True, capture_output=True, text=True, cwd=ROOT)
+            results[variant] = json.loads(out.stdout.strip().splitlines()[-1])
+            m = results[variant]
+            print(f"{variant:28s} read {m['read_s']:.3f}s ({m['pages_per_s']} pg/s)  "
+                  f"compile {m['compile_s']:.3f}s ({m['rows_per_s']} rows/s)  "
+                  f"write {m['write_s']:.3f}s  peak {m['peak_rss_mb']} MB")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baselines = json.load(f)
+    if args.update_baseline:
+        baselines[args.machine] = {'params': params, 'results': results}
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Baseline for {args.machine} saved to {args.baseline}')
+        return 0
+    baseline = baselines.get(args.machine)
+    if baseline is None:
+        print(f'No baseline for {args.machine} in {args.baseline} '
+              f'(has: {", ".join(sorted(baselines)) or "none"}); record one with '
+              f'--update-baseline and commit it')
+        return 2
+    if baseline.get('params') != params:
+        print(f'Baseline was recorded with {baseline.get("params")}; run with those '
+              f'parameters or --update-baseline')
+        return 2
+    problems = compare(results, baseline['results'], args.tolerance)
+    for p in problems:
+        print(f'REGRESSION {p}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
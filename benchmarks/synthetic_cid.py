@@ -0,0 +1,162 @@
+'''
+Gera PDFs sintéticos no estilo CID, sem dependências externas: tabelas
+com réguas desenhadas, cabeçalhos "KEY: value", tabelas 7/8 com
+cabeçalho dividido e células só com espaço de largura zero (U+200B).
+'''
+import os
+import random
+import argparse
+
+
+# Código 0x80 da fonte mapeado para U+200B via /Differences.
+ZWSP = '\u200b'
+ZWSP_CODE = b'\x80'
+
+PAGE_W, PAGE_H = 595, 842
+ROW_H = 11
+
+
+def _pdf_string(text):
+    raw = text.replace(ZWSP, '\x00').encode('latin-1', 'replace')
+    raw = raw.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+    return b'(' + raw.replace(b'\x00', ZWSP_CODE) + b')'
+
+
+def _text(x, y, text, size=6):
+    return b'BT /F1 %d Tf %.1f %.1f Td ' % (size, x, y) + _pdf_string(text) + b' Tj ET'
+
+
+def _table_ops(tbl, top, left=30, width=PAGE_W - 60):
+    ncol = max(len(r) for r in tbl)
+    w = width / ncol
+    ops = []
+    y = top
+    for row in tbl:
+        lines = max(str(c or '').count('\n') + 1 for c in row)
+        h = ROW_H * lines
+        y -= h
+        for ci in range(ncol):
+            x = left + ci * w
+            ops.append(b'%.1f %.1f %.1f %d re S' % (x, y, w, h))
+            cell = row[ci] if ci < len(row) else ''
+            for li, part in enumerate(str(cell or '').split('\n')):
+                if part:
+                    ops.append(_text(x + 1.5, y + h - (li + 1) * ROW_H + 3, part))
+    return ops, y - 8
+
+
+def _tables_for_page(rng, doc_no, n_tables, split_headers, zwsp_cells, kv_headers):
+    tables = []
+    for ti in range(1, n_tables + 1):
+        if ti == 1:
+            # cabeçalho em duas linhas + 'None' exercitam fix_none_values_in_table
+            tables.append([['PLANTE', 'SAP/COFOR', 'SUPPLIER NAME\nMARELLI'],
+                           ['BETIM', f'{1000 + doc_no}', 'None']])
+        elif ti == 2 and kv_headers:
+            tables.append([[f'CAPACITY INCREASE {rng.choice(["DATA", "DATE"])}: 03/09/2024',
+                            'SOP DATE: 30/04/2025'], ['', '']])
+        elif ti in (7, 8) and split_headers:
+            rows = [['PART NUMBER', '', ''], ['PART', 'QTY WEEK', 'CAPACITY']]
+            for r in range(rng.randint(2, 4)):
+                rows.append([f'P{doc_no}-{r}', f'{rng.randint(10, 999)}  {rng.randint(1, 52)}',
+                             f'{rng.randint(100, 9999)}'])
+            if zwsp_cells:
+                rows.append([ZWSP, ZWSP, ''])
+            tables.append(rows)
+        elif ti == 6:
+            rows = [['ITEM', 'Col_1', 'DESCRIPTION']]
+            for r in range(rng.randint(2, 5)):
+                rows.append([str(r + 1), f'V{rng.randint(1, 99)}', f'DESC {r}'])
+            if zwsp_cells:
+                rows.append(['', ZWSP, ''])
+            tables.append(rows)
+        elif ti % 3 == 0:
+            tables.append([['FIELD', 'VALUE'], ['MONTHLY VOLUME', str(rng.randint(1000, 90000))],
+                           ['SHIFTS', str(rng.randint(1, 3))]])
+        else:
+            rows = [[f'H{ti}_{c}' for c in range(4)]]
+            for r in range(rng.randint(1, 4)):
+                rows.append([f'{rng.randint(0, 9999)}' for _ in range(4)])
+            tables.append(rows)
+    return tables
+
+
+def write_pdf(path, pages):
+    '''
+    Grava um PDF mínimo. pages é uma lista de (linhas de texto, tabelas).
+    '''
+    objs = []
+
+    def add(body):
+        objs.append(body)
+        return len(objs)
+
+    font = add(b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica '
+               b'/Encoding << /Type /Encoding /BaseEncoding /WinAnsiEncoding '
+               b'/Differences [128 /uni200B] >> >>')
+    pages_id = add(None)
+    kids = []
+    for lines, tables in pages:
+        ops = []
+        y = PAGE_H - 30
+        for line in lines:
+            ops.append(_text(30, y, line, size=8))
+            y -= 12
+        y -= 6
+        for tbl in tables:
+            tbl_ops, y = _table_ops(tbl, y)
+            ops.extend(tbl_ops)
+        stream = b'\n'.join(ops)
+        content = add(b'<< /Length %d >>\nstream\n' % len(stream) + stream + b'\nendstream')
+        kids.append(add(b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] '
+                        b'/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>'
+                        % (pages_id, PAGE_W, PAGE_H, font, content)))
+    objs[pages_id - 1] = (b'<< /Type /Pages /Kids [' + b' '.join(b'%d 0 R' % k for k in kids)
+                          + b'] /Count %d >>' % len(kids))
+    catalog = add(b'<< /Type /Catalog /Pages %d 0 R >>' % pages_id)
+    out = bytearray(b'%PDF-1.4\n')
+    offsets = []
+    for i, body in enumerate(objs, start=1):
+        offsets.append(len(out))
+        out += b'%d 0 obj\n' % i + body + b'\nendobj\n'
+    xref = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objs) + 1)
+    for off in offsets:
+        out += b'%010d 00000 n \n' % off
+    out += b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objs) + 1, catalog, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def generate_corpus(out_dir, n_docs=20, pages=(1, 3), tables=(8, 11), split_headers=True,
+                    zwsp_cells=True, kv_headers=True, seed=0):
+    '''
+    Gera n_docs PDFs em out_dir variando páginas e tabelas por página.
+    Devolve a lista de caminhos. Mesmo seed, mesmos arquivos.
+    '''
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for d in range(n_docs):
+        doc_pages = []
+        for _ in range(rng.randint(*pages)):
+            lines = [f'PLANTE  BETIM  SAP/COFOR  {1000 + d}',
+                     f'SUPPLIER NAME  SUPPLIER {d % 7}']
+            n_tables = rng.randint(*tables)
+            doc_pages.append((lines, _tables_for_page(rng, d, n_tables, split_headers,
+                                                      zwsp_cells, kv_headers)))
+        p = os.path.join(out_dir, f'cid_{d:04d}.pdf')
+        write_pdf(p, doc_pages)
+        paths.append(p)
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera PDFs CID sintéticos.')
+    parser.add_argument('out_dir')
+    parser.add_argument('--docs', type=int, default=20)
+    parser.add_argument('--max-pages', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    generate_corpus(args.out_dir, n_docs=args.docs, pages=(1, args.max_pages), seed=args.seed)
@@ -0,0 +1,290 @@
+import os
+import json
+import traceback
+from collections import namedtuple
+from functools import partial
+
+from pdf_classify import RejectedDocument, check_first_page
+from pdf_compact import compact_frame
+from pdf_dedupe import find_duplicates, full_text_fingerprint, source_labels, text_fingerprint
+from pdf_cache import cached_read_tables
+from pdf_headers import configure as configure_headers
+from pdf_metrics import NULL_METRICS, Metrics, last_stage
+from pdf_pool import SupervisedPool, TaskFailure
+from pdf_sinks import Output
+
+
+BatchResult = namedtuple('BatchResult', ['path', 'frame', 'error', 'events', 'stage', 'reason'],
+                         defaults=((), None, None))
+
+
+def _frames_of(dfc):
+    # várias estratégias devolvem {nome: DataFrame}; uma só, o DataFrame
+    return dfc.values() if isinstance(dfc, dict) else (dfc,)
+
+
+def process_pdf(path, read_pdf, compile_tables, cache=None, read_opts=None, measure=False,
+                classify=True, compact=False):
+    '''
+    Lê e compila um PDF; roda dentro do worker. Com measure, os tempos
+    de cada estágio voltam em BatchResult.events. Com classify, PDF sem os
+    marcadores de CID na 1ª página é rejeitado antes da extração de
+    tabelas, dentro da mesma leitura. Com compact, o DataFrame sai do worker
+    já enxuto (pdf_compact.compact_frame).
+    '''
+    print(f'Processing {path}...')
+    metrics = Metrics(path) if measure else NULL_METRICS
+    try:
+        with metrics.stage('pdf') as pdf_ev:
+            opts = dict(read_opts or {})
+            if classify:
+                opts['first_page_check'] = check_first_page
+            tables = cached_read_tables(path, read_pdf, cache,
+                                        metrics=metrics if measure else None, **opts)
+            with metrics.stage('compile_tables', tables=len(tables)) as ev:
+                dfc = compile_tables(tables)
+                ev['rows'] = pdf_ev['rows'] = sum(int(df.shape[0]) for df in _frames_of(dfc))
+            for df in _frames_of(dfc):
+                if not df.empty:
+                    df.insert(0, 'source_pdf', os.path.basename(path))
+            if compact:
+                with metrics.stage('compact'):
+                    if isinstance(dfc, dict):
+                        dfc = {k: compact_frame(df) for k, df in dfc.items()}
+                    else:
+                        dfc = compact_frame(dfc)
+    except RejectedDocument as e:
+        return BatchResult(path, None, f'RejectedDocument: {e}', metrics.events, last_stage(),
+                           'rejected')
+    except Exception:
+        return BatchResult(path, None, traceback.format_exc(), metrics.events, last_stage(), 'error')
+    return BatchResult(path, dfc, None, metrics.events)
+
+
+def make_task(read_pdf, compile_tables, cache=None, read_opts=None, measure=False, classify=True,
+              compact=False):
+    '''
+    process_pdf com as opções fixadas: o que cada worker roda por PDF.
+    '''
+    return partial(process_pdf, read_pdf=read_pdf, compile_tables=compile_tables, cache=cache,
+                   read_opts=read_opts, measure=measure, classify=classify, compact=compact)
+
+
+def _relabel(res, labels):
+    label = labels.get(res.path) if labels else None
+    if label and res.frame is not None:
+        for df in _frames_of(res.frame):
+            if not df.empty:
+                df['source_pdf'] = label
+    return res
+
+
+def iter_batch(pdfs, read_pdf, compile_tables, workers=1, cache=None, read_opts=None,
+               measure=False, header_rules=None, timeout=None, max_memory_mb=None, labels=None,
+               classify=True, compact=False, pool=None):
+    '''
+    Processa os PDFs e devolve os resultados na mesma ordem de entrada.
+    Com workers > 1, ou com timeout/max_memory_mb, cada PDF roda num
+    processo supervisionado: PDF que trava, estoura memória ou derruba o
+    worker vira uma falha com o estágio em que parou, e o lote segue.
+    header_rules é repassado ao pdf_headers.configure de cada worker.
+    pool é um SupervisedPool já aquecido (criado com make_task), usado no
+    lugar de um novo. labels ({PDF: nome}) troca o source_pdf, ex.: para
+    listar as cópias de um documento.
+    '''
+    task = make_task(read_pdf, compile_tables, cache=cache, read_opts=read_opts, measure=measure,
+                     classify=classify, compact=compact)
+    if pool is None and workers <= 1 and not (timeout or max_memory_mb):
+        for p in pdfs:
+            yield _relabel(task(p), labels)
+        return
+    if pool is None:
+        pool = SupervisedPool(task, workers=workers, timeout=timeout, max_memory_mb=max_memory_mb,
+                              initializer=configure_headers, initargs=(header_rules,))
+    for p, res in pool.imap(pdfs):
+        if isinstance(res, TaskFailure):
+            res = BatchResult(p, None, str(res), (), res.stage, res.reason)
+        yield _relabel(res, labels)
+
+
+def _write_output(frames, sinks, dedupe=None, metrics_log=None, drop_empty=False, drop=None):
+    '''
+    Grava um DataFrame por PDF nos sinks. Com várias estratégias, cada item
+    de frames é {estratégia: DataFrame} e sinks/dedupe são dicts por estratégia.
+    drop_empty tira da saída as colunas sem nenhum valor. Com drop (PDFs
+    cujas linhas antigas saem), os sinks são atualizados com as linhas de
+    frames em vez de reescritos (Output.update); devolve os que não sabem
+    se atualizar, que ficaram como estavam.
+    '''
+    multi = isinstance(sinks, dict)
+    sinks_by = sinks if multi else {None: sinks}
+    dedupe_by = dedupe if multi else {None: dedupe}
+    metrics = Metrics('<output>') if metrics_log else NULL_METRICS
+    outputs = {k: Output(s, dedupe=dedupe_by.get(k), drop_empty=drop_empty)
+               for k, s in sinks_by.items()}
+    try:
+        for item in frames:
+            for k, df in (item.items() if multi else ((None, item),)):
+                with metrics.stage('spool', rows=int(df.shape[0]), **({'strategy': k} if multi else {})):
+                    outputs[k].write(df)
+    except BaseException:
+        for output in outputs.values():
+            output.discard()
+        raise
+    stale = []
+    for k, output in outputs.items():
+        with metrics.stage('write' if drop is None else 'update', rows=output.spool.n_rows,
+                           sinks=[type(s).__name__ for s in output.sinks],
+                           **({'strategy': k} if multi else {})):
+            if drop is None:
+                output.close()
+            else:
+                stale += output.update(drop)
+        for sink in output.sinks:
+            if sink not in stale:
+                print(f'Data saved to {sink.path}')
+    if metrics_log:
+        metrics_log.add(metrics.events)
+    return stale
+
+
+def print_failure(res):
+    reason = res.error.strip().splitlines()[-1]
+    if res.reason == 'rejected':
+        print(f'Skipped {res.path}: {reason}')
+    else:
+        print(f'Failed {res.path} [{res.stage}]: {reason}')
+    return reason
+
+
+def report_failed(failed, report_path=None):
+    '''
+    Resume as falhas e grava o relatório de quarentena (motivo, estágio e
+    erro de cada PDF); sem falhas, remove o relatório antigo.
+    '''
+    if report_path and not failed and os.path.exists(report_path):
+        os.remove(report_path)
+    if not failed:
+        return
+    rejected = [r for r in failed if r.reason == 'rejected']
+    errors = [r for r in failed if r.reason != 'rejected']
+    if rejected:
+        print(f'{len(rejected)} PDF(s) skipped as non-CID: '
+              + ', '.join(os.path.basename(r.path) for r in rejected))
+    if errors:
+        print(f'{len(errors)} PDF(s) failed: ' + ', '.join(os.path.basename(r.path) for r in errors))
+    if report_path:
+        report = [{'pdf': r.path, 'reason': r.reason, 'stage': r.stage,
+                   'error': r.error.strip().splitlines()[-1]} for r in failed]
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f'Failure report saved to {report_path}')
+
+
+def run_batch(pdfs, read_pdf, compile_tables, sinks, dedupe=None, metrics_log=None,
+              checkpoint=None, dedupe_docs='hash', compact=False, **batch_opts):
+    '''
+    Execução completa: processa todos os PDFs e regrava as saídas.
+    Com checkpoint, os PDFs já feitos numa execução anterior são pulados e
+    suas linhas vêm dos chunks gravados; o checkpoint é apagado no fim.
+    Cópias do mesmo documento (dedupe_docs, veja pdf_dedupe) são extraídas
+    uma vez só, com todas no source_pdf. compact liga o pdf_compact e tira
+    as colunas vazias da saída.
+    '''
+    failed = []
+    pdfs, aliases = find_duplicates(pdfs, dedupe_docs)
+    batch_opts['labels'] = source_labels(aliases)
+
+    def handle(res):
+        if res.error:
+            print_failure(res)
+            failed.append(res)
+            return None
+        return res.frame
+
+    def frames():
+        todo = pdfs
+        if checkpoint:
+            for res in checkpoint.results():
+                df = handle(res)
+                if df is not None:
+                    yield df
+            todo = [p for p in pdfs if p not in checkpoint.done]
+        for res in iter_batch(todo, read_pdf, compile_tables, measure=bool(metrics_log),
+                              compact=compact, **batch_opts):
+            if metrics_log:
+                metrics_log.add(res.events)
+            if checkpoint:
+                checkpoint.add(res)
+            df = handle(res)
+            if df is not None:
+                yield df
+        if checkpoint:
+            checkpoint.flush()
+
+    _write_output(frames(), sinks, dedupe, metrics_log, drop_empty=compact)
+    if checkpoint:
+        checkpoint.clear()
+    return failed
+
+
+def run_incremental(pdfs, read_pdf, compile_tables, sinks, manifest, dedupe=None,
+                    metrics_log=None, checkpoint_every=100, dedupe_docs='hash', compact=False,
+                    append=False, **batch_opts):
+    '''
+    Processa só os PDFs novos ou alterados, troca as linhas deles no
+    manifesto e remonta as saídas a partir das partes já compiladas.
+    Cópias de um documento ficam no manifesto só como alias_of.
+
+    Com append, as saídas não são remontadas: cada sink troca só as linhas
+    dos PDFs que mudaram (sink.update). Os que não sabem fazer isso (XLSX,
+    Arrow, CSV quando linhas saem) ficam em manifest.stale e são refeitos
+    no próximo passo sem append.
+    '''
+    had_rows = {p for p, e in manifest.files.items() if e.get('part')}
+    removed = manifest.removed(pdfs)
+    for p in removed:
+        manifest.drop(p)
+    known = {p for p, e in manifest.files.items() if e.get('alias_of')}
+    unique, aliases = find_duplicates(
+        pdfs, dedupe_docs, digest=manifest.digest,
+        fingerprint=partial(manifest.fingerprint, fn=text_fingerprint),
+        confirm=partial(manifest.fingerprint, fn=full_text_fingerprint))
+    copies = {dup: p for p, group in aliases.items() for dup in group[1:]}
+    for dup, p in copies.items():
+        entry = manifest.files.get(dup, {})
+        if entry.get('alias_of') != p or entry.get('sha256') != manifest.digest(dup):
+            manifest.record(dup, alias_of=p)
+    todo = manifest.changed(unique, aliases)
+    batch_opts['labels'] = source_labels(aliases)
+    failed = []
+    for i, res in enumerate(iter_batch(todo, read_pdf, compile_tables, measure=bool(metrics_log),
+                                       compact=compact, **batch_opts), 1):
+        if metrics_log:
+            metrics_log.add(res.events)
+        if res.error:
+            reason = print_failure(res)
+            manifest.record(res.path, error=reason, aliases=aliases.get(res.path))
+            failed.append(res)
+        else:
+            manifest.record(res.path, res.frame, aliases=aliases.get(res.path))
+        # o manifesto salvo também serve de checkpoint: quem caiu no meio recomeça daqui
+        if checkpoint_every and i % checkpoint_every == 0:
+            manifest.save()
+    manifest.save()
+    changed = todo or removed or copies.keys() - known
+    missing = not all(os.path.exists(s.path) for s in sinks)
+    if append and changed and not missing:
+        drop = [p for p in removed + todo + list(copies) if p in had_rows]
+        fresh = [s for s in sinks if s.path not in manifest.stale]
+        stale = _write_output(manifest.frames(todo), fresh, dedupe, metrics_log,
+                              drop_empty=compact, drop=drop)
+        manifest.stale = sorted(set(manifest.stale) | {s.path for s in stale})
+    elif changed or missing or manifest.stale:
+        targets = sinks if changed or missing else [s for s in sinks if s.path in manifest.stale]
+        _write_output(manifest.frames(), targets, dedupe, metrics_log, drop_empty=compact)
+        manifest.stale = []
+    else:
+        print('No changes')
+    manifest.save()
+    return failed
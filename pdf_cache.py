@@ -0,0 +1,171 @@
+import os
+import json
+import glob
+import hashlib
+import inspect
+from functools import partial
+
+import pdfplumber
+
+from pdf_extract import PROFILE_TABLES, first_page_text
+from pdf_metrics import NULL_METRICS
+
+
+# Incrementar quando read_pdf mudar de um jeito que o hash do código não pegue.
+EXTRACTOR_VERSION = 2
+
+
+def file_sha256(path, chunk=1 << 20):
+    '''
+    Hash do conteúdo do arquivo, lido em blocos.
+    '''
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def function_source(fn):
+    '''
+    Código-fonte de fn para os hashes de versão (partial: o da função
+    de dentro, mais os argumentos fixados). Sem fonte disponível (REPL,
+    notebook, exec, python -), usa módulo, nome e fn.__version__, que quem
+    registra a função pode definir para invalidar cache e checkpoints.
+    '''
+    version = getattr(fn, '__version__', None)
+    extra = ''
+    while isinstance(fn, partial):
+        extra += f'{fn.args!r}{sorted(fn.keywords.items())!r}'
+        fn = fn.func
+    version = version or getattr(fn, '__version__', None)
+    try:
+        return inspect.getsource(fn) + extra
+    except (OSError, TypeError):
+        name = f'{getattr(fn, "__module__", None)}.{getattr(fn, "__qualname__", repr(fn))}'
+        if version is None:
+            print(f'Warning: no source code for {name}; set {name}.__version__ so that '
+                  f'changes to it invalidate cached results')
+        return f'{name}:{version}{extra}'
+
+
+def function_hash(fn):
+    '''
+    Hash curto do código-fonte de uma função (veja function_source).
+    '''
+    return hashlib.sha256(function_source(fn).encode()).hexdigest()[:12]
+
+
+def extractor_version(read_pdf):
+    '''
+    Versão do extrator: muda quando read_pdf, read_pages,
+    fix_none_values_in_table ou process_split_header_tables (ou o
+    pdfplumber) mudam.
+    '''
+    h = hashlib.sha256(f'{EXTRACTOR_VERSION}:{pdfplumber.__version__}'.encode())
+    funcs = [read_pdf] + [getattr(read_pdf, '__globals__', {}).get(n) for n in
+                          ('read_pages', 'fix_none_values_in_table', 'process_split_header_tables')]
+    for fn in funcs:
+        if fn is not None:
+            h.update(function_source(fn).encode())
+    return h.hexdigest()[:12]
+
+
+class ExtractionCache:
+    '''
+    Cache em disco do dict all_tabs de read_pdf (e do texto da 1ª página,
+    quando a classificação rodou na leitura), chaveado pelo hash do PDF e
+    pela versão do extrator. Evicção LRU (mtime) limitada a max_bytes.
+    '''
+
+    def __init__(self, cache_dir, version, max_bytes=512 * 2**20):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, digest):
+        return os.path.join(self.cache_dir, f'{self.version}-{digest}.json')
+
+    def get(self, digest):
+        '''
+        {'tables': all_tabs, 'first_page': texto ou None}, ou None se não há.
+        '''
+        p = self._path(digest)
+        try:
+            with open(p, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        os.utime(p)
+        return entry
+
+    def put(self, digest, tables, first_page=None):
+        p = self._path(digest)
+        tmp = f'{p}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'tables': tables, 'first_page': first_page}, f, ensure_ascii=False)
+        os.replace(tmp, p)
+
+    def evict(self):
+        '''
+        Remove entradas de versões antigas e as menos usadas até caber em max_bytes.
+        '''
+        entries = []
+        for p in glob.glob(os.path.join(self.cache_dir, '*.json')):
+            if not os.path.basename(p).startswith(f'{self.version}-'):
+                os.remove(p)
+                continue
+            st = os.stat(p)
+            entries.append((st.st_mtime, st.st_size, p))
+        total = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(p)
+            total -= size
+
+    def clear(self):
+        for p in glob.glob(os.path.join(self.cache_dir, '*.json')):
+            os.remove(p)
+
+
+def cached_read_tables(path, read_pdf, cache=None, metrics=None, first_page_check=None,
+                       **read_opts):
+    '''
+    Devolve as tabelas do PDF, usando o cache quando possível.
+    read_opts vai direto para read_pdf (page_workers, layouts...); em
+    acerto de cache read_pdf nem é chamado. first_page_check roda do
+    mesmo jeito com ou sem acerto: no acerto, sobre o texto da 1ª página
+    guardado na entrada, ou, se a entrada veio de uma leitura sem
+    classificação, sobre a 1ª página lida de novo.
+    '''
+    m = metrics or NULL_METRICS
+    seen = {}
+
+    def check(text):
+        seen['first_page'] = text
+        return first_page_check(text)
+
+    def read():
+        opts = dict(read_opts, first_page_check=check) if first_page_check else read_opts
+        _, tables = read_pdf(path, profile=PROFILE_TABLES, metrics=metrics, **opts)
+        return tables
+
+    if cache is None:
+        return read()
+    with m.stage('cache_lookup') as ev:
+        digest = file_sha256(path)
+        entry = cache.get(digest)
+        ev['hit'] = entry is not None
+    if entry is None:
+        tables = read()
+        cache.put(digest, tables, seen.get('first_page'))
+        return tables
+    if first_page_check:
+        with m.stage('classify', page=1) as ev:
+            text = entry.get('first_page')
+            if text is None:
+                text, _ = first_page_text(path)
+            ev['result'] = first_page_check(text)
+    return entry['tables']
@@ -0,0 +1,84 @@
+import os
+import json
+import pickle
+import shutil
+
+
+class Checkpoint:
+    '''
+    Checkpoint de uma execução completa: a cada `every` PDFs terminados,
+    os resultados (DataFrame ou falha) vão para um chunk em disco e o
+    índice registra quais PDFs já foram feitos. Se a execução morrer, o
+    --resume pula esses PDFs e remonta a saída a partir dos chunks.
+    '''
+
+    def __init__(self, path, version, every=100, resume=False):
+        self.path = path
+        self.version = version
+        self.every = max(1, every)
+        self.chunks = []
+        self.done = set()
+        self._buffer = []
+        index = self._load_index() if resume else None
+        if index is None:
+            if resume:
+                print(f'No usable checkpoint in {path}; starting from scratch')
+            self.clear()
+        else:
+            self.chunks = index['chunks']
+            self.done = set(index['done'])
+            print(f'Resuming: {len(self.done)} PDF(s) already done')
+        os.makedirs(path, exist_ok=True)
+
+    def _index_path(self):
+        return os.path.join(self.path, 'index.json')
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # extrator ou compilação mudaram: os chunks não valem mais
+        if index.get('version') != self.version:
+            return None
+        return index
+
+    def add(self, res):
+        '''
+        Registra o resultado de um PDF (BatchResult); grava um chunk a cada `every`.
+        '''
+        self._buffer.append(res._replace(events=()))
+        if len(self._buffer) >= self.every:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        name = f'chunk_{len(self.chunks):05d}.pkl'
+        chunk = os.path.join(self.path, name)
+        with open(f'{chunk}.tmp', 'wb') as f:
+            pickle.dump(self._buffer, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f'{chunk}.tmp', chunk)
+        self.chunks.append(name)
+        self.done.update(r.path for r in self._buffer)
+        self._buffer = []
+        tmp = f'{self._index_path()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'chunks': self.chunks,
+                       'done': sorted(self.done)}, f, indent=1)
+        os.replace(tmp, self._index_path())
+
+    def results(self):
+        '''
+        Resultados já gravados, um chunk de cada vez, na ordem em que foram feitos.
+        '''
+        for name in self.chunks:
+            with open(os.path.join(self.path, name), 'rb') as f:
+                yield from pickle.load(f)
+
+    def clear(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.chunks = []
+        self.done = set()
+        self._buffer = []
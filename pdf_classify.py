@@ -0,0 +1,45 @@
+import re
+
+from pdf_extract import first_page_text
+from pdf_headers import document_markers
+
+
+class RejectedDocument(Exception):
+    '''
+    O PDF não tem os marcadores de nenhum tipo conhecido e não é extraído.
+    '''
+
+
+def classify_text(text):
+    '''
+    Tipo de documento (ex.: 'cid') pelo texto da 1ª página, ou None. Ganha
+    o tipo com mais marcadores presentes, desde que chegue ao mínimo.
+    '''
+    text = re.sub(r'\s+', ' ', (text or '').replace('\u200b', '')).upper()
+    markers, minimum = document_markers()
+    best, best_hits = None, 0
+    for doc_type, words in markers.items():
+        hits = sum(1 for w in words if w.upper() in text)
+        if hits >= minimum and hits > best_hits:
+            best, best_hits = doc_type, hits
+    return best
+
+
+def check_first_page(text):
+    '''
+    Tipo do documento pelo texto da 1ª página; levanta RejectedDocument se
+    for desconhecido. É o first_page_check que read_pdf roda na página já
+    aberta, antes de extrair as tabelas.
+    '''
+    doc_type = classify_text(text)
+    if doc_type is None:
+        raise RejectedDocument('no known document markers on the first page')
+    return doc_type
+
+
+def classify_pdf(path):
+    '''
+    Igual a check_first_page, abrindo o PDF só para isso (uso avulso).
+    '''
+    text, _ = first_page_text(path)
+    return check_first_page(text)
@@ -0,0 +1,252 @@
+import os
+import glob
+import time
+import argparse
+from functools import partial
+
+from pdf_batch import report_failed
+from pdf_cache import ExtractionCache, extractor_version, function_hash
+from pdf_checkpoint import Checkpoint
+from pdf_daemon import job_result, serve
+from pdf_dedupe import DEDUPE_MODES
+from pdf_headers import configure as configure_headers, rules_version
+from pdf_layout import LayoutStore
+from pdf_manifest import Manifest
+from pdf_metrics import MetricsLog
+from pdf_pipeline import Pipeline, pdf_source
+from pdf_profile import profile_pdfs, sample_pdfs
+from pdf_sinks import FORMATS, build_sinks
+from pdf_strategies import compile_strategies, resolve as resolve_strategies
+
+
+def build_arg_parser():
+    '''
+    Argumentos de linha de comando comuns aos três leitores.
+    '''
+    parser = argparse.ArgumentParser(description='Compila tabelas de PDFs CID em Excel.')
+    parser.add_argument('--input-dir', default='pdf_reader',
+                        help='pasta com os PDFs')
+    parser.add_argument('--output-stem', default='compiled_output',
+                        help='nome base das saídas, do manifesto e dos relatórios')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='processos em paralelo (1 = serial)')
+    parser.add_argument('--page-workers', type=int, default=1,
+                        help='processos por PDF para dividir PDFs grandes em faixas de páginas')
+    parser.add_argument('--layouts-dir',
+                        help='pasta de templates de layout (um por formulário); páginas de um '
+                             'formulário conhecido detectam as tabelas bloco a bloco')
+    parser.add_argument('--cache-dir', default='.cid_cache',
+                        help='pasta do cache de extração')
+    parser.add_argument('--cache-max-mb', type=int, default=512,
+                        help='tamanho máximo do cache em MB')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='sempre reextrai com o pdfplumber')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='apaga o cache antes de rodar')
+    parser.add_argument('--format', default='xlsx',
+                        help=f'saídas separadas por vírgula: {",".join(FORMATS)}')
+    parser.add_argument('--partition-by', choices=('source_pdf', 'run_date'), default='source_pdf',
+                        help='particionamento do Parquet')
+    parser.add_argument('--csv-chunk-rows', type=int, default=0,
+                        help='linhas por arquivo CSV (0 = arquivo único)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='processa só PDFs novos/alterados (usa o manifesto)')
+    parser.add_argument('--watch', action='store_true',
+                        help='fica rodando e processa novos PDFs assim que chegam')
+    parser.add_argument('--watch-interval', type=float, default=1.0,
+                        help='segundos entre varreduras da pasta no --watch')
+    parser.add_argument('--header-rules',
+                        help='JSON com regras de cabeçalho (aliases, padrões) sobre as padrão')
+    parser.add_argument('--timeout', type=float,
+                        help='segundos máximos por PDF; acima disso o PDF vai para a quarentena')
+    parser.add_argument('--max-memory-mb', type=float,
+                        help='RSS máximo por worker; acima disso o PDF vai para a quarentena')
+    parser.add_argument('--checkpoint-every', type=int, default=100,
+                        help='grava um checkpoint a cada N PDFs (0 desliga)')
+    parser.add_argument('--resume', action='store_true',
+                        help='retoma a execução interrompida, pulando os PDFs do checkpoint')
+    parser.add_argument('--strategies',
+                        help='lista de estratégias de compilação (ex.: igor_done,igor_test ou all); '
+                             'cada PDF é lido uma vez e cada estratégia grava sua própria saída')
+    parser.add_argument('--dedupe-docs', choices=DEDUPE_MODES, default='hash',
+                        help='extrai uma vez só as cópias do mesmo documento: hash (bytes iguais), '
+                             'text (também 1ª página igual) ou off')
+    parser.add_argument('--no-classify', action='store_true',
+                        help='não confere os marcadores de CID na 1ª página antes de extrair')
+    parser.add_argument('--compact', action='store_true',
+                        help='datas e quantidades tipadas, strings internadas/categoricals e '
+                             'sem colunas vazias')
+    parser.add_argument('--serve', action='store_true',
+                        help='serviço residente com workers aquecidos (veja pdf_daemon.py)')
+    parser.add_argument('--queue-dir',
+                        help='no --serve, pasta de entrada: PDFs copiados aqui entram na fila')
+    parser.add_argument('--socket',
+                        help='no --serve, socket Unix que aceita PDFs (JSON por linha)')
+    parser.add_argument('--max-queue', type=int, default=100,
+                        help='no --serve, tamanho máximo da fila antes de recusar PDFs')
+    parser.add_argument('--rebuild-interval', type=float, default=60.0,
+                        help='no --serve, os pedidos só acrescentam/trocam linhas nas saídas; '
+                             'as que não aceitam isso (XLSX, Arrow, CSV com remoção) são '
+                             'refeitas quando a fila esvazia, no máximo a cada N segundos')
+    parser.add_argument('--profile', type=int, nargs='?', const=5, metavar='N',
+                        help='perfila N PDFs (padrão 5) com cProfile/tracemalloc e grava '
+                             'relatório e pilhas para flamegraph, sem gerar a saída')
+    parser.add_argument('--metrics',
+                        help='grava tempos por PDF/página/estágio em JSON lines neste arquivo')
+    return parser
+
+
+def _snapshot(pdf_folder):
+    snap = {}
+    for p in glob.glob(os.path.join(pdf_folder, '*.pdf')):
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        snap[p] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+
+def watch(pdf_folder, run_pass, interval=1.0):
+    '''
+    Fica olhando a pasta e roda run_pass() quando ela muda. Só dispara
+    depois de a pasta ficar igual por um intervalo, para não pegar
+    arquivo ainda sendo copiado.
+    '''
+    print(f'Watching {pdf_folder} (Ctrl+C to stop)...')
+    last = done = None
+    try:
+        while True:
+            snap = _snapshot(pdf_folder)
+            if snap == last and snap != done:
+                run_pass()
+                done = snap
+            last = snap
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+
+def run_main(read_pdf, compile_tables, dedupe=None, argv=None):
+    '''
+    main() compartilhado dos três leitores: monta um Pipeline com o
+    read_pdf/compile_tables do script e as opções da linha de comando,
+    processa a pasta e grava as saídas. Cada PDF vai para o spool assim
+    que termina; dedupe, se informado, é aplicado às colunas de cada PDF
+    e à união final. Com --strategies, o compile_tables do script é
+    trocado pelas estratégias escolhidas.
+    '''
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if args.profile is not None and args.profile < 1:
+        parser.error('--profile N needs N >= 1')
+    configure_headers(args.header_rules)
+    pdf_folder = args.input_dir
+    out_stem = args.output_stem
+    strategies = None
+    if args.strategies:
+        if args.incremental or args.watch or args.serve:
+            parser.error('--strategies works only with full runs, not --incremental/--watch/--serve')
+        try:
+            strategies = resolve_strategies(args.strategies)
+        except ValueError as e:
+            parser.error(str(e))
+    report_path = f'{out_stem}.failures.json'
+    cache = None
+    if not args.no_cache:
+        cache = ExtractionCache(args.cache_dir, extractor_version(read_pdf),
+                                max_bytes=args.cache_max_mb * 2**20)
+        if args.clear_cache:
+            cache.clear()
+    formats = [f.strip() for f in args.format.split(',') if f.strip()]
+    if strategies:
+        # uma leitura por PDF; cada estratégia compila uma cópia e tem suas próprias saídas
+        compiled_by = [st.version or st.compile_tables for st in strategies]
+        compile_tables = partial(compile_strategies, strategies=tuple(strategies))
+        dedupe = {st.name: st.dedupe for st in strategies}
+        sinks = {st.name: build_sinks(formats, f'{out_stem}.{st.name}',
+                                      partition_by=args.partition_by,
+                                      csv_chunk_rows=args.csv_chunk_rows)
+                 for st in strategies}
+    else:
+        compiled_by = [compile_tables]
+        sinks = build_sinks(formats, out_stem, partition_by=args.partition_by,
+                            csv_chunk_rows=args.csv_chunk_rows)
+    read_opts = dict(page_workers=args.page_workers)
+    if args.layouts_dir:
+        read_opts['layouts'] = LayoutStore(args.layouts_dir)
+    metrics_log = MetricsLog(args.metrics) if args.metrics else None
+    pipeline = Pipeline(compile_tables, read_pdf=read_pdf, dedupe=dedupe, workers=args.workers,
+                        cache=cache, read_opts=read_opts, header_rules=args.header_rules,
+                        timeout=args.timeout, max_memory_mb=args.max_memory_mb,
+                        dedupe_docs=args.dedupe_docs, classify=not args.no_classify,
+                        compact=args.compact, metrics_log=metrics_log)
+
+    def run_version():
+        # só para checkpoint/manifesto: o que, se mudar, invalida os resultados gravados
+        compile_version = '+'.join(c if isinstance(c, str) else function_hash(c)
+                                   for c in compiled_by)
+        return '-'.join((extractor_version(read_pdf), compile_version, rules_version())
+                        + (('compact',) if args.compact else ()))
+
+    failed = []
+    try:
+        if args.profile is not None:
+            # em processo, sem cache e sem pool: o que se quer medir é a extração
+            task = pipeline.task(cache=None, read_opts=dict(read_opts, page_workers=1),
+                                 measure=True)
+            profile_pdfs(sample_pdfs(list(pdf_source(pdf_folder)), args.profile), task, out_stem)
+            return failed
+        if args.incremental or args.watch or args.serve:
+            manifest = Manifest(f'{out_stem}.manifest.json', f'{out_stem}.parts', run_version())
+            # workers aquecidos para o serviço inteiro, em vez de um pool por lote
+            pool = pipeline.pool().start() if args.serve else None
+
+            def run_pass(jobs=()):
+                # pedidos do --serve atualizam as saídas; o passo completo as remonta
+                pdfs = set(pdf_source(pdf_folder))
+                # PDFs enviados de fora da pasta continuam na saída enquanto existirem
+                pdfs.update(p for p in manifest.files if os.path.exists(p))
+                pdfs.update(jobs)
+                failed[:] = pipeline.run_incremental(sorted(pdfs), sinks, manifest,
+                                                     checkpoint_every=args.checkpoint_every,
+                                                     pool=pool, append=bool(jobs))
+                report_failed(failed, report_path)
+                if cache:
+                    cache.evict()
+                return {p: job_result(manifest.files.get(p)) for p in jobs}
+
+            last_rebuild = [time.monotonic()]
+
+            def rebuild_stale():
+                if manifest.stale and time.monotonic() - last_rebuild[0] >= args.rebuild_interval:
+                    run_pass()
+                    last_rebuild[0] = time.monotonic()
+
+            try:
+                if args.serve:
+                    run_pass()
+                    serve(run_pass, pdf_folder, queue_dir=args.queue_dir, socket_path=args.socket,
+                          max_queue=args.max_queue, idle=rebuild_stale)
+                    if manifest.stale:
+                        run_pass()
+                elif args.watch:
+                    watch(pdf_folder, run_pass, interval=args.watch_interval)
+                else:
+                    run_pass()
+            finally:
+                if pool:
+                    pool.close()
+            return failed
+        checkpoint = None
+        if args.checkpoint_every > 0:
+            checkpoint = Checkpoint(f'{out_stem}.checkpoint', run_version(),
+                                    every=args.checkpoint_every, resume=args.resume)
+        failed = pipeline.run(pdf_folder, sinks, checkpoint=checkpoint)
+        if cache:
+            cache.evict()
+        report_failed(failed, report_path)
+        return failed
+    finally:
+        if metrics_log:
+            metrics_log.close()
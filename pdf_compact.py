@@ -0,0 +1,91 @@
+import re
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from pdf_headers import is_quantity_column
+
+
+DATE_RE = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})$')
+INT_RE = re.compile(r'^-?(0|[1-9]\d*)$')
+# 1.600 = 1600: ponto de milhar, como vem nas colunas de peças
+GROUPED_INT_RE = re.compile(r'^-?[1-9]\d{0,2}(\.\d{3})+$')
+# 5,5 ou 7.25: o CID usa os dois separadores decimais
+DECIMAL_RE = re.compile(r'^-?(0|[1-9]\d*)[.,]\d+$')
+# abaixo disso o categorical custa mais do que economiza
+CATEGORY_MIN_ROWS = 32
+CATEGORY_MAX_RATIO = 0.5
+
+
+def _parse_dates(values):
+    out = []
+    for v in values:
+        m = DATE_RE.match(v)
+        if not m:
+            return None
+        d, mth, y = (int(g) for g in m.groups())
+        try:
+            out.append(date(y, mth, d))
+        except ValueError:
+            return None
+    return out
+
+
+def _parse_quantities(values):
+    '''
+    Inteiros (com ou sem ponto de milhar) ou, se algum tiver casas
+    decimais, floats; None se algum valor não for número. Numa coluna
+    com decimais, 1.600 é lido como 1,6.
+    '''
+    if all(INT_RE.match(v) or GROUPED_INT_RE.match(v) for v in values):
+        return [int(v.replace('.', '')) for v in values]
+    if all(INT_RE.match(v) or DECIMAL_RE.match(v) for v in values):
+        return [float(v.replace(',', '.')) for v in values]
+    return None
+
+
+def _compact_column(name, col, mask):
+    n = len(col)
+    present = [str(v).strip() for v, ok in zip(col, mask) if ok]
+    if not present:
+        return col
+    # datas dd/mm/aaaa -> date; quantidades (pelo cabeçalho) -> int/float
+    parsed = _parse_dates(present)
+    if parsed is None and is_quantity_column(name):
+        parsed = _parse_quantities(present)
+        if parsed is not None and len(parsed) == n:
+            # sem nulos: coluna numérica de verdade, que o pandas junta num bloco só
+            return np.array(parsed)
+    if parsed is not None:
+        it = iter(parsed)
+        # object explícito: numa lista, int com None viraria float64 (1 -> 1.0 na saída)
+        out = np.empty(n, dtype=object)
+        out[:] = [next(it) if ok else None for ok in mask]
+        return out
+    out = [sys.intern(v) if type(v) is str else (v if ok else None) for v, ok in zip(col, mask)]
+    if n >= CATEGORY_MIN_ROWS and len(set(present)) <= n * CATEGORY_MAX_RATIO:
+        return pd.Categorical(out)
+    return out
+
+
+def compact_frame(df):
+    '''
+    Versão enxuta do DataFrame de um PDF: datas dd/mm/aaaa viram date,
+    colunas de quantidade viram números (int64/float64 se não houver
+    nulos, senão object com int/float e None, para 1 não virar 1.0; só se
+    todos os valores casarem), strings iguais viram um objeto
+    só (inclusive nos pickles do spool e do manifesto) e, em frames
+    grandes, colunas muito repetitivas viram categorical. Colunas com
+    nomes repetidos são tratadas por posição.
+    '''
+    if df.empty:
+        return df
+    values = df.to_numpy(dtype=object)
+    mask = df.notna().to_numpy()
+    data = {i: _compact_column(name, values[:, i].tolist(), mask[:, i].tolist())
+            for i, name in enumerate(df.columns)}
+    out = pd.DataFrame(data, index=df.index)
+    out.columns = df.columns
+    return out
@@ -0,0 +1,59 @@
+import pandas as pd
+
+
+def rows_to_columns(rows, width):
+    '''
+    Converte linhas em listas por coluna, completando linhas curtas com None
+    (como o pd.DataFrame(rows, columns=...) fazia).
+    '''
+    for r in rows:
+        if len(r) > width:
+            raise ValueError(f'{width} columns passed, passed data had {len(r)} columns')
+    return [[r[i] if i < len(r) else None for r in rows] for i in range(width)]
+
+
+def kv_block(tbl):
+    '''
+    Tabela campo/valor transposta: uma coluna por campo, uma linha.
+    '''
+    return [r[0] for r in tbl], [[r[1]] for r in tbl]
+
+
+def block_rows(block):
+    _, cols = block
+    return len(cols[0]) if cols else 0
+
+
+def tile_block(block, n):
+    '''
+    Repete/corta as linhas do bloco até ter exatamente n linhas.
+    '''
+    names, cols = block
+    rows = block_rows(block)
+    if rows == n or rows == 0:
+        return block
+    reps = -(-n // rows)
+    return names, [(col * reps)[:n] for col in cols]
+
+
+def assemble_columns(blocks):
+    '''
+    Monta o DataFrame final de uma vez a partir de blocos (nomes, colunas):
+    completa cada coluna até o maior número de linhas e faz um único
+    ffill no frame inteiro. Equivale a reindex + ffill por tabela seguido
+    de pd.concat(axis=1), sem criar um DataFrame por tabela.
+    '''
+    if not blocks:
+        return pd.DataFrame()
+    max_rows = max(block_rows(b) for b in blocks)
+    names = []
+    data = {}
+    for bnames, cols in blocks:
+        for name, col in zip(bnames, cols):
+            if len(col) < max_rows:
+                col = col + [None] * (max_rows - len(col))
+            data[len(names)] = col
+            names.append(name)
+    df = pd.DataFrame(data, index=pd.RangeIndex(max_rows))
+    df.columns = names
+    return df.ffill()
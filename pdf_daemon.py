@@ -0,0 +1,328 @@
+'''
+Serviço residente: mantém os workers aquecidos e recebe PDFs copiados na
+pasta dos PDFs, por uma pasta de entrada (--queue-dir) e/ou por um
+socket Unix (--socket). Sobe com qualquer leitor:
+
+    python pdf_reader_igor_test.py --serve --queue-dir inbox --socket /tmp/cid.sock
+
+e os PDFs podem ser enviados com:
+
+    python pdf_daemon.py /tmp/cid.sock caminho/arquivo.pdf --wait
+    python pdf_daemon.py /tmp/cid.sock --status
+
+Protocolo do socket: uma linha JSON por pedido, uma linha JSON de resposta.
+    {"pdf": "a.pdf", "wait": false}  ->  {"ok": true, "queued": 3}
+    {"cmd": "status"}                ->  {"ok": true, "queued": 0, "processed": 10, ...}
+Com a fila cheia a resposta é {"ok": false, "error": "queue full"}: o
+cliente tenta de novo depois (backpressure). A pasta de entrada só é
+esvaziada quando há espaço na fila.
+'''
+import os
+import sys
+import glob
+import json
+import time
+import shutil
+import signal
+import socket
+import argparse
+import threading
+import traceback
+import socketserver
+from collections import OrderedDict
+
+
+class JobQueue:
+    '''
+    Fila limitada de PDFs (sem repetidos), segura entre threads. Quem pede
+    wait recebe o resultado quando o lote com o PDF termina.
+    '''
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._cond = threading.Condition()
+        self.processed = 0
+        self.failed = 0
+        self.busy = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+    def room(self):
+        with self._cond:
+            return self.max_size - len(self._items)
+
+    def put(self, path, waiter=None):
+        '''
+        Enfileira o PDF; devolve a posição na fila ou None se estiver cheia.
+        '''
+        with self._cond:
+            if path not in self._items and len(self._items) >= self.max_size:
+                return None
+            self._items.setdefault(path, [])
+            if waiter is not None:
+                self._items[path].append(waiter)
+            self._cond.notify()
+            return list(self._items).index(path) + 1
+
+    def take(self, timeout):
+        '''
+        Tudo que está na fila (espera até timeout s se vazia): [(pdf, waiters)].
+        '''
+        with self._cond:
+            if not self._items:
+                self._cond.wait(timeout)
+            batch = list(self._items.items())
+            self._items.clear()
+            self.busy = bool(batch)
+            return batch
+
+    def done(self, batch, results):
+        with self._cond:
+            self.busy = False
+            for path, waiters in batch:
+                result = results.get(path) or {'status': 'missing'}
+                self.processed += 1
+                self.failed += result['status'] == 'failed'
+                for w in waiters:
+                    w.result = result
+                    w.set()
+
+    def status(self):
+        with self._cond:
+            return {'queued': len(self._items), 'max_queue': self.max_size, 'busy': self.busy,
+                    'processed': self.processed, 'failed': self.failed}
+
+
+class _Waiter(threading.Event):
+    result = None
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                reply = self._reply(json.loads(line))
+            except Exception as e:
+                reply = {'ok': False, 'error': f'{type(e).__name__}: {e}'}
+            self.wfile.write((json.dumps(reply) + '\n').encode('utf-8'))
+            self.wfile.flush()
+
+    def _reply(self, req):
+        jobs = self.server.jobs
+        if req.get('cmd') == 'status':
+            return dict(ok=True, **jobs.status())
+        path = job_path(req['pdf'])
+        if not os.path.isfile(path):
+            return {'ok': False, 'error': f'not found: {path}'}
+        waiter = _Waiter() if req.get('wait') else None
+        pos = jobs.put(path, waiter)
+        if pos is None:
+            return {'ok': False, 'error': 'queue full'}
+        if waiter is None:
+            return {'ok': True, 'pdf': path, 'queued': pos}
+        waiter.wait(req.get('timeout'))
+        return dict(ok=waiter.result is not None, pdf=path, **(waiter.result or {'error': 'timeout'}))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def job_path(path):
+    '''
+    Caminho do PDF como o manifesto guarda: relativo se estiver sob a pasta atual.
+    '''
+    path = os.path.abspath(path)
+    rel = os.path.relpath(path)
+    return path if rel.startswith('..') else rel
+
+
+def job_result(entry):
+    '''
+    Resultado de um PDF para quem esperou por ele, a partir da entrada do manifesto.
+    '''
+    if entry is None:
+        return {'status': 'missing'}
+    if entry.get('alias_of'):
+        return {'status': 'duplicate', 'alias_of': entry['alias_of']}
+    if entry.get('error'):
+        return {'status': 'failed', 'error': entry['error']}
+    return {'status': 'ok', 'rows': entry['rows']}
+
+
+def _pdf_stats(folder):
+    '''
+    {PDF da pasta: (tamanho, mtime)}, em ordem de nome.
+    '''
+    snap = {}
+    for p in sorted(glob.glob(os.path.join(folder, '*.pdf'))):
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        snap[p] = (st.st_size, st.st_mtime_ns)
+    return snap
+
+
+def _free_path(path):
+    '''
+    path, ou nome-1.pdf, nome-2.pdf... o primeiro que ainda não existe.
+    '''
+    stem, ext = os.path.splitext(path)
+    n = 0
+    while os.path.exists(path):
+        n += 1
+        path = f'{stem}-{n}{ext}'
+    return path
+
+
+def _scan_inbox(queue_dir, pdf_folder, jobs, last, seen):
+    '''
+    Move para pdf_folder e enfileira os PDFs da pasta de entrada que não
+    mudaram desde a última varredura (cópia terminada), enquanto houver
+    espaço na fila. Um PDF com o nome de outro que já está em pdf_folder
+    entra com outro nome, sem sobrescrever o original. last guarda
+    (tamanho, mtime) entre chamadas; seen recebe o dos PDFs movidos, para
+    _scan_folder não enfileirá-los de novo.
+    '''
+    snap = _pdf_stats(queue_dir)
+    for p, sig in snap.items():
+        if last.get(p) != sig or jobs.room() <= 0:
+            continue
+        target = os.path.join(pdf_folder, os.path.basename(p))
+        dest = _free_path(target)
+        if dest != target:
+            print(f'{target} already exists; saved as {dest}')
+        shutil.move(p, dest)
+        seen[dest] = sig
+        jobs.put(job_path(dest))
+    last.clear()
+    last.update(snap)
+
+
+def _scan_folder(pdf_folder, jobs, last, seen):
+    '''
+    Enfileira os PDFs novos ou alterados copiados direto em pdf_folder,
+    quando param de mudar entre duas varreduras. seen guarda (tamanho,
+    mtime) dos PDFs já processados ou enfileirados.
+    '''
+    snap = _pdf_stats(pdf_folder)
+    for p, sig in snap.items():
+        if last.get(p) == sig and seen.get(p) != sig and jobs.room() > 0:
+            seen[p] = sig
+            jobs.put(job_path(p))
+    last.clear()
+    last.update(snap)
+
+
+def serve(run_pass, pdf_folder, queue_dir=None, socket_path=None, max_queue=100, poll=0.5,
+          idle=None):
+    '''
+    Laço do serviço: junta o que chegou (pdf_folder, pasta de entrada e
+    socket), roda run_pass([pdfs]) -> {pdf: resultado} e responde quem
+    está esperando. Os PDFs que já estão em pdf_folder ao subir ficam
+    para o passo inicial de quem chama.
+    idle(), se houver, roda quando a fila está vazia. Sai com Ctrl+C ou
+    SIGTERM (na thread principal); ao sair, os tratadores de sinal
+    anteriores voltam.
+    '''
+    jobs = JobQueue(max_queue)
+    server = None
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = _Server(socket_path, _Handler)
+        server.jobs = jobs
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    if queue_dir:
+        os.makedirs(queue_dir, exist_ok=True)
+    os.makedirs(pdf_folder, exist_ok=True)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # sinais só podem ser tratados na thread principal; fora dela, quem chama cuida disso
+    handlers = {}
+    if threading.current_thread() is threading.main_thread():
+        handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+        signal.signal(signal.SIGTERM, stop)
+    sources = ', '.join(s for s in (pdf_folder, queue_dir, socket_path) if s)
+    print(f'Serving {sources} (Ctrl+C to stop)...')
+    seen = _pdf_stats(pdf_folder)
+    last_inbox = {}
+    last_folder = dict(seen)
+    try:
+        while True:
+            if queue_dir:
+                _scan_inbox(queue_dir, pdf_folder, jobs, last_inbox, seen)
+            _scan_folder(pdf_folder, jobs, last_folder, seen)
+            batch = jobs.take(poll)
+            if not batch:
+                if idle:
+                    try:
+                        idle()
+                    except Exception:
+                        traceback.print_exc()
+                continue
+            t0 = time.perf_counter()
+            try:
+                results = run_pass([p for p, _ in batch])
+            except Exception:
+                # o serviço continua de pé; quem esperava recebe o erro
+                traceback.print_exc()
+                error = traceback.format_exc().strip().splitlines()[-1]
+                results = {p: {'status': 'failed', 'error': error} for p, _ in batch}
+            jobs.done(batch, results)
+            print(f'{len(batch)} job(s) done in {time.perf_counter() - t0:.2f}s')
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # um segundo SIGTERM/Ctrl+C não pode interromper o desligamento
+        for sig in handlers:
+            signal.signal(sig, signal.SIG_IGN)
+        try:
+            if server:
+                server.shutdown()
+                server.server_close()
+                if os.path.exists(socket_path):
+                    os.remove(socket_path)
+        finally:
+            for sig, handler in handlers.items():
+                signal.signal(sig, handler)
+
+
+def submit(socket_path, request, timeout=None):
+    '''
+    Manda um pedido (dict) ao serviço e devolve a resposta.
+    '''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(socket_path)
+        s.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        with s.makefile('r', encoding='utf-8') as f:
+            return json.loads(f.readline())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Envia PDFs ao serviço residente (--serve).')
+    parser.add_argument('socket')
+    parser.add_argument('pdfs', nargs='*')
+    parser.add_argument('--wait', action='store_true', help='espera cada PDF ser processado')
+    parser.add_argument('--status', action='store_true')
+    args = parser.parse_args(argv)
+    if args.status:
+        print(json.dumps(submit(args.socket, {'cmd': 'status'})))
+        return 0
+    code = 0
+    for p in args.pdfs:
+        reply = submit(args.socket, {'pdf': os.path.abspath(p), 'wait': args.wait})
+        print(json.dumps(reply, ensure_ascii=False))
+        code = code or (0 if reply.get('ok') else 1)
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
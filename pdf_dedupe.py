@@ -0,0 +1,102 @@
+import os
+import re
+import hashlib
+
+from pdf_cache import file_sha256
+from pdf_extract import document_text, first_page_text
+
+
+DEDUPE_MODES = ('off', 'hash', 'text')
+# source_pdf de um documento com cópias: 'a.pdf; b.pdf' (o extraído primeiro)
+LABEL_SEP = '; '
+
+
+def _text_hash(texts, n_pages):
+    # sem ZWSP, espaços colapsados, sem diferença de caixa
+    text = '\f'.join(re.sub(r'\s+', ' ', t.replace('\u200b', '')).strip().casefold()
+                     for t in texts)
+    if not text.strip('\f'):
+        return None
+    return hashlib.sha256(f'{n_pages}:{text}'.encode('utf-8')).hexdigest()
+
+
+def text_fingerprint(path):
+    '''
+    Impressão digital barata: texto da 1ª página mais o número de páginas.
+    Pega o mesmo CID reexportado ou reenviado com outros metadados, mas
+    sozinha não basta (CIDs que só diferem depois da 1ª página colidem):
+    find_duplicates confirma cada grupo com full_text_fingerprint. None
+    se não houver texto.
+    '''
+    try:
+        text, n_pages = first_page_text(path)
+    except Exception:
+        return None
+    return _text_hash([text], n_pages)
+
+
+def full_text_fingerprint(path):
+    '''
+    Impressão digital do texto de todas as páginas.
+    '''
+    try:
+        texts = document_text(path)
+    except Exception:
+        return None
+    return _text_hash(texts, len(texts))
+
+
+def _group_by(paths, key):
+    groups = {}
+    for p in paths:
+        k = key(p)
+        # sem chave (None), o arquivo fica sozinho
+        groups.setdefault(p if k is None else (k,), []).append(p)
+    return list(groups.values())
+
+
+def find_duplicates(pdfs, mode='hash', digest=file_sha256, fingerprint=text_fingerprint,
+                    confirm=full_text_fingerprint):
+    '''
+    Agrupa cópias do mesmo documento antes da extração. Só arquivos do
+    mesmo tamanho são comparados por hash; com mode='text', os que
+    sobrarem sozinhos ainda são comparados pelo texto da 1ª página e, os
+    que baterem, pelo texto de todas as páginas (confirm).
+    Devolve (PDFs a extrair, {PDF extraído: [ele e suas cópias]}); o
+    primeiro em ordem de caminho é o que fica.
+    '''
+    if mode == 'off':
+        return list(pdfs), {}
+    groups = []
+    for same_size in _group_by(pdfs, os.path.getsize):
+        groups += _group_by(same_size, digest) if len(same_size) > 1 else [same_size]
+    if mode == 'text':
+        singles = [g[0] for g in groups if len(g) == 1]
+        groups = [g for g in groups if len(g) > 1]
+        for g in _group_by(singles, fingerprint):
+            groups += _group_by(g, confirm) if len(g) > 1 else [g]
+    aliases = {}
+    unique = []
+    for g in groups:
+        g = sorted(g)
+        unique.append(g[0])
+        if len(g) > 1:
+            aliases[g[0]] = g
+            for dup in g[1:]:
+                print(f'Skipping {dup} (duplicate of {g[0]})')
+    return sorted(unique), aliases
+
+
+def source_labels(aliases):
+    '''
+    {PDF extraído: 'a.pdf; b.pdf'}: o valor de source_pdf com todas as cópias.
+    '''
+    return {p: LABEL_SEP.join(os.path.basename(a) for a in group) for p, group in aliases.items()}
+
+
+def doc_id(label):
+    '''
+    Identificador estável do documento a partir do source_pdf: o nome do
+    PDF extraído, sem as cópias listadas no rótulo.
+    '''
+    return os.path.basename(str(label).split(LABEL_SEP, 1)[0])
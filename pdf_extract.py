@@ -0,0 +1,247 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+import pdfplumber
+
+from pdf_headers import is_column_key
+from pdf_layout import extract_page_tables
+from pdf_metrics import NULL_METRICS, Metrics
+
+
+PROFILE_TABLES = 'tables'
+PROFILE_TEXT = 'text'
+PROFILE_BOTH = 'both'
+PROFILES = (PROFILE_TABLES, PROFILE_TEXT, PROFILE_BOTH)
+
+
+def process_columns(text):
+    '''
+    Extrai pares chave/valor de texto corrido.
+    '''
+    lines = text.splitlines()
+    columns = {}
+    current = None
+    for line in lines:
+        if not line.strip():
+            continue
+        parts = [p.strip() for p in line.split('  ') if p.strip()]
+        for idx, val in enumerate(parts):
+            if is_column_key(val):
+                current = val
+                columns.setdefault(current, [])
+                if idx + 1 < len(parts):
+                    columns[current].append(parts[idx + 1])
+            elif current and idx % 2 == 1:
+                columns[current].append(val)
+    return columns
+
+
+def fix_none_values_in_table(table, table_num):
+    '''
+    Substitui células None com base em cabeçalhos divididos.
+    '''
+    if table_num not in {1, 10, 11}:
+        return table
+    fixed = []
+    header_labels = {}
+    if table and table[0]:
+        for ci, cell in enumerate(table[0]):
+            if isinstance(cell, str) and '\n' in cell:
+                parts = cell.split('\n', 1)
+                header_labels[ci] = parts[1].strip()
+    for ri, row in enumerate(table):
+        new_row = list(row)
+        for ci, cell in enumerate(row):
+            if (cell is None or cell == 'None') and ci in header_labels:
+                new_row[ci] = header_labels[ci]
+        fixed.append(new_row)
+    return fixed
+
+
+def process_split_header_tables(table, table_num):
+    '''
+    Alinha cabeçalhos multipartes para tabelas específicas (6,7,8).
+    Filtra linhas vazias antes de alinhar.
+    '''
+    if table_num not in {6, 7, 8} or len(table) < 2:
+        return table
+    # Header parts from second row
+    header_parts = [p for p in table[1] if isinstance(p, str) and p.strip()]
+    # Clean header parts
+    header_parts = [hp.strip() for cell in header_parts for hp in cell.split() if hp.strip()]
+    result = [header_parts]
+    # Function to check real non-empty cell (remove zero-width)
+    def is_real(cell):
+        if cell is None: return False
+        txt = str(cell).replace('\u200b', '').strip()
+        return bool(txt)
+    for row in table[2:]:
+        # drop row if all cells empty or zero-width
+        if not any(is_real(cell) for cell in row):
+            continue
+        aligned = []
+        ki = 0
+        for cell in row:
+            if isinstance(cell, str):
+                for part in cell.split('  '):
+                    if ki < len(header_parts):
+                        aligned.append(part.strip())
+                        ki += 1
+        # pad missing
+        while len(aligned) < len(header_parts):
+            aligned.append(None)
+        result.append(aligned)
+    return result
+
+
+class LazyColumns:
+    '''
+    Colunas chave/valor do texto corrido; process_columns só roda
+    quando to_frame() é chamado.
+    '''
+
+    def __init__(self, texts):
+        self.texts = texts
+        self._frame = None
+
+    def to_frame(self):
+        if self._frame is None:
+            all_cols = {}
+            for text in self.texts:
+                for k, vs in process_columns(text).items():
+                    all_cols.setdefault(k, []).extend(vs)
+            # normalize column-wise
+            max_len = max((len(v) for v in all_cols.values()), default=0)
+            for k, v in all_cols.items():
+                all_cols[k] = v + [None] * (max_len - len(v))
+            self._frame = pd.DataFrame(all_cols).dropna(how='all')
+        return self._frame
+
+
+def first_page_text(path):
+    '''
+    (texto da 1ª página, número de páginas), sem extrair tabelas. Usado nas
+    checagens baratas feitas antes da extração.
+    '''
+    with pdfplumber.open(path) as pdf:
+        if not pdf.pages:
+            return '', 0
+        page = pdf.pages[0]
+        text = page.extract_text() or ''
+        page.close()
+        return text, len(pdf.pages)
+
+
+def document_text(path):
+    '''
+    Texto de cada página, sem extrair tabelas.
+    '''
+    texts = []
+    with pdfplumber.open(path) as pdf:
+        for page in pdf.pages:
+            texts.append(page.extract_text() or '')
+            page.close()
+    return texts
+
+
+def _check_first_page(page, check, metrics, text=None):
+    with metrics.stage('classify', page=page.page_number) as ev:
+        if text is None:
+            text = page.extract_text() or ''
+        ev['result'] = check(text)
+
+
+def read_pages(path, profile=PROFILE_BOTH, pages=None, layouts=None, metrics=None,
+               first_page_check=None):
+    '''
+    Extrai texto e/ou tabelas das páginas pedidas (1-based; None = todas).
+    Cada página é fechada logo após a extração para liberar o cache de
+    layout, mantendo a memória estável em PDFs grandes. Com layouts (um
+    LayoutStore), páginas de um formulário conhecido detectam as tabelas
+    bloco a bloco (pdf_layout.extract_page_tables). metrics (pdf_metrics.Metrics) recebe os tempos
+    de cada estágio por página.
+    '''
+    metrics = metrics or NULL_METRICS
+    want_text = profile != PROFILE_TABLES
+    want_tables = profile != PROFILE_TEXT
+    texts = []
+    all_tabs = {}
+    with metrics.stage('pdfplumber.open'):
+        pdf = pdfplumber.open(path, pages=pages)
+        pdf_pages = pdf.pages
+    with pdf:
+        for page in pdf_pages:
+            pg = page.page_number
+            if want_text:
+                with metrics.stage('extract_text', page=pg):
+                    texts.append(page.extract_text() or '')
+            if first_page_check and pg == 1:
+                _check_first_page(page, first_page_check, metrics,
+                                  texts[-1] if want_text else None)
+            if want_tables:
+                with metrics.stage('extract_tables', page=pg) as ev:
+                    if layouts is not None:
+                        tables = extract_page_tables(page, layouts)
+                    else:
+                        tables = page.extract_tables() or []
+                    ev['tables'] = len(tables)
+                for ti, tbl in enumerate(tables, start=1):
+                    with metrics.stage('fix_none_values_in_table', page=pg, table=ti):
+                        ft = fix_none_values_in_table(tbl, ti)
+                    if ti in {7, 8}:
+                        with metrics.stage('process_split_header_tables', page=pg, table=ti):
+                            ft = process_split_header_tables(ft, ti)
+                    all_tabs[f'Table_{pg}_{ti}'] = ft
+            page.close()
+    return texts, all_tabs
+
+
+def _read_pages_measured(path, profile, pages, layouts=None):
+    # versão para o pool: devolve os eventos junto, já que o Metrics não volta do worker
+    metrics = Metrics(path)
+    texts, tabs = read_pages(path, profile, pages, layouts=layouts, metrics=metrics)
+    return texts, tabs, metrics.events
+
+
+def _page_ranges(n_pages, n_chunks):
+    size = -(-n_pages // n_chunks)
+    return [list(range(first, min(first + size, n_pages + 1)))
+            for first in range(1, n_pages + 1, size)]
+
+
+def read_pdf(path, profile=PROFILE_BOTH, page_workers=1, parallel_min_pages=8, layouts=None,
+             metrics=None, first_page_check=None):
+    '''
+    Lê PDF, extrai colunas e tabelas.
+    profile escolhe o que extrair: 'tables', 'text' ou 'both'. Devolve
+    (LazyColumns ou None, dict de tabelas).
+    Com page_workers > 1, PDFs com pelo menos parallel_min_pages páginas
+    são divididos em faixas de páginas processadas em paralelo; o
+    resultado mantém a ordem Table_{pg}_{ti}. first_page_check: veja
+    read_pages; com faixas, roda antes de distribuir as páginas.
+    '''
+    if profile not in PROFILES:
+        raise ValueError(f'profile inválido: {profile!r}')
+    n_pages = 0
+    if page_workers > 1:
+        with pdfplumber.open(path) as pdf:
+            n_pages = len(pdf.pages)
+            if first_page_check and n_pages >= max(parallel_min_pages, 2):
+                _check_first_page(pdf.pages[0], first_page_check, metrics or NULL_METRICS)
+                first_page_check = None
+    if n_pages < max(parallel_min_pages, 2):
+        texts, all_tabs = read_pages(path, profile, layouts=layouts, metrics=metrics,
+                                     first_page_check=first_page_check)
+    else:
+        ranges = _page_ranges(n_pages, page_workers)
+        texts, all_tabs = [], {}
+        task = partial(_read_pages_measured, path, profile, layouts=layouts)
+        with ProcessPoolExecutor(max_workers=len(ranges)) as ex:
+            for t, tabs, events in ex.map(task, ranges):
+                texts.extend(t)
+                all_tabs.update(tabs)
+                if metrics is not None:
+                    metrics.events.extend(events)
+    cols = LazyColumns(texts) if profile != PROFILE_TABLES else None
+    return cols, all_tabs
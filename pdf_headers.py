@@ -0,0 +1,144 @@
+import re
+import json
+import hashlib
+from functools import lru_cache
+
+
+DEFAULT_RULES = {
+    # variações de cabeçalho -> nome canônico
+    'aliases': {
+        'CAPACITY INCREASE DATA': 'CAPACITY INCREASE DATE',
+        'CAPACITY INCREASE DATE': 'CAPACITY INCREASE DATE',
+    },
+    # cabeçalho no formato "KEY: value"
+    'key_value_pattern': r'^([A-Z/ _]+):\s*(.+)$',
+    # rótulos que abrem uma coluna em process_columns
+    'column_keys': ['PLANTE', 'SAP/COFOR', 'SUPPLIER NAME'],
+    'column_key_pattern': r'^[A-Z_/]+$',
+    # marcadores da 1ª página por tipo de documento (pdf_classify); o tipo
+    # precisa de pelo menos min_markers deles
+    'document_markers': {'cid': ['PLANTE', 'SAP/COFOR', 'CAPACITY INCREASE']},
+    'min_markers': 2,
+    # colunas numéricas no --compact (as demais só viram número se forem datas):
+    # as de capacidade do CID (Parts/Day, Parts/Week, Shift/Day, Hours/Shift,
+    # Days/Week) e QTY/QUANT/VOLUME
+    'quantity_column_pattern': r'^\s*(PARTS|SHIFTS?|HOURS|DAYS)\s*/|QTY|QUANT|VOLUME',
+}
+
+_rules = None
+_kv_re = None
+_quantity_re = None
+_column_key_re = None
+_column_keys = frozenset()
+_aliases = {}
+_alias_prefixes = ()
+
+
+def configure(rules_path=None):
+    '''
+    Carrega as regras (padrão + JSON opcional por cima) e zera os caches.
+    Também serve de initializer dos pools, para os workers usarem as
+    mesmas regras do processo principal.
+    '''
+    global _rules, _kv_re, _quantity_re, _column_key_re, _column_keys, _aliases, _alias_prefixes
+    rules = dict(DEFAULT_RULES)
+    if rules_path:
+        with open(rules_path, encoding='utf-8') as f:
+            rules.update(json.load(f))
+    _rules = rules
+    _kv_re = re.compile(rules['key_value_pattern'])
+    _column_key_re = re.compile(rules['column_key_pattern'])
+    _quantity_re = re.compile(rules['quantity_column_pattern'], re.IGNORECASE)
+    _column_keys = frozenset(rules['column_keys'])
+    _aliases = dict(rules['aliases'])
+    # aliases mais longos primeiro, para "X DATA:" não casar com um "X" mais curto
+    _alias_prefixes = tuple(sorted(_aliases, key=len, reverse=True))
+    for fn in (canonical_header, alias_header, split_kv_header, is_column_key, is_quantity_column,
+               dedupe_names):
+        fn.cache_clear()
+
+
+def rules_version():
+    '''
+    Hash das regras ativas; entra na versão do manifesto.
+    '''
+    return hashlib.sha256(json.dumps(_rules, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def document_markers():
+    '''
+    ({tipo: [marcadores]}, mínimo de marcadores) das regras ativas.
+    '''
+    return _rules['document_markers'], _rules['min_markers']
+
+
+@lru_cache(maxsize=None)
+def canonical_header(header):
+    '''
+    Normaliza variantes de cabeçalho, com ou sem ": valor" no fim
+    (ex.: 'CAPACITY INCREASE DATA: 03/09/2024' -> 'CAPACITY INCREASE DATE: 03/09/2024').
+    '''
+    if not isinstance(header, str):
+        return header
+    clean = header.strip().replace('  ', ' ')
+    if clean in _aliases:
+        return _aliases[clean]
+    for alias in _alias_prefixes:
+        if clean.startswith(alias + ':'):
+            return _aliases[alias] + clean[len(alias):]
+    return header
+
+
+@lru_cache(maxsize=None)
+def alias_header(header):
+    '''
+    Troca o cabeçalho pelo nome canônico só quando ele é exatamente um alias.
+    '''
+    if not isinstance(header, str):
+        return header
+    return _aliases.get(header.strip(), header)
+
+
+@lru_cache(maxsize=None)
+def split_kv_header(header):
+    '''
+    'KEY: value' -> (KEY canônico, value); None se não for nesse formato.
+    '''
+    if not isinstance(header, str):
+        return None
+    m = _kv_re.match(header.strip())
+    if not m:
+        return None
+    key = m.group(1).strip()
+    return _aliases.get(key, key), m.group(2).strip()
+
+
+@lru_cache(maxsize=None)
+def is_column_key(token):
+    return token in _column_keys or bool(_column_key_re.match(token))
+
+
+@lru_cache(maxsize=None)
+def is_quantity_column(name):
+    return bool(_quantity_re.search(str(name)))
+
+
+@lru_cache(maxsize=4096)
+def dedupe_names(cols):
+    '''
+    Renomeia repetidos como X, X.1, X.2 (cols é uma tupla).
+    '''
+    seen = {}
+    result = []
+    for col in cols:
+        base = str(col)
+        if base not in seen:
+            seen[base] = 0
+            result.append(base)
+        else:
+            seen[base] += 1
+            result.append(f"{base}.{seen[base]}")
+    return tuple(result)
+
+
+configure()
@@ -0,0 +1,155 @@
+import os
+import json
+import hashlib
+
+from pdfplumber.table import TableSettings
+
+
+# Tolerância (pt) ao arredondar a geometria.
+GRID = 2
+# Altura (pt), a partir da primeira régua, do cabeçalho que entra na impressão digital.
+HEADER_BAND = 60
+# Distância máxima (pt) entre réguas do mesmo bloco de tabela.
+BLOCK_GAP = 6
+# Templates guardados no máximo; passando disso, layouts novos não são gravados.
+MAX_TEMPLATES = 500
+
+
+def _shapes(page):
+    return page.rects + page.lines
+
+
+def page_fingerprint(page):
+    '''
+    Impressão digital do formulário: tamanho da página, extensão
+    horizontal das réguas e as réguas do cabeçalho (HEADER_BAND pontos a
+    partir da primeira), arredondados em GRID pontos. As réguas das linhas
+    de dados ficam de fora, porque mudam com o número de linhas e com
+    células de várias linhas; dois documentos do mesmo formulário dão o
+    mesmo hash. Página sem réguas também tem impressão digital.
+    '''
+    def snap(v):
+        return int(round(v / GRID))
+
+    shapes = _shapes(page)
+    h = hashlib.sha1(f'{snap(page.width)}x{snap(page.height)}'.encode())
+    if shapes:
+        first = min(o['top'] for o in shapes)
+        header = sorted(
+            (snap(o['x0']), snap(o['top'] - first), snap(o['x1']), snap(o['bottom'] - first))
+            for o in shapes if o['bottom'] <= first + HEADER_BAND
+        )
+        extent = (snap(min(o['x0'] for o in shapes)), snap(max(o['x1'] for o in shapes)))
+        h.update(repr((extent, header)).encode())
+    return h.hexdigest()
+
+
+def table_blocks(page, x0=None, x1=None):
+    '''
+    Faixas verticais (top, bottom) de réguas que se encostam (a menos de
+    BLOCK_GAP pontos): em formulários com as tabelas separadas, uma por
+    tabela, qualquer que seja o número de linhas de cada uma. x0/x1
+    limitam as réguas consideradas.
+    '''
+    spans = sorted((o['top'], o['bottom']) for o in _shapes(page)
+                   if (x0 is None or o['x1'] >= x0) and (x1 is None or o['x0'] <= x1))
+    blocks = []
+    for top, bottom in spans:
+        if blocks and top <= blocks[-1][1] + BLOCK_GAP:
+            blocks[-1][1] = max(blocks[-1][1], bottom)
+        else:
+            blocks.append([top, bottom])
+    return blocks
+
+
+def _find_in_blocks(page, tset, bbox):
+    '''
+    find_tables() em cada bloco de réguas dentro da faixa horizontal bbox
+    (x0, x1), em vez da página inteira: interseções e células só se
+    cruzam dentro do bloco, e cada célula procura o texto só entre os
+    caracteres dele.
+    '''
+    x0, x1 = bbox
+    found = []
+    for top, bottom in table_blocks(page, x0, x1):
+        region = (x0 - 1, top - 1, x1 + 1, bottom + 1)
+        block = page.filter(lambda o, r=region: (o.get('x0', r[0]) >= r[0]
+                                                 and o.get('x1', r[2]) <= r[2]
+                                                 and o.get('top', r[1]) >= r[1]
+                                                 and o.get('bottom', r[3]) <= r[3]))
+        found.extend(block.find_tables(tset))
+    return found
+
+
+class LayoutStore:
+    '''
+    Templates de layout em disco: um JSON por formulário (impressão
+    digital), com as table_settings, o bbox das tabelas da página que o
+    criou e se as tabelas dele podem ser detectadas bloco a bloco. Um
+    arquivo por template permite que vários workers gravem ao mesmo
+    tempo; passando de max_templates, layouts novos não são gravados.
+    '''
+
+    def __init__(self, layouts_dir, max_templates=MAX_TEMPLATES):
+        self.layouts_dir = layouts_dir
+        self.max_templates = max_templates
+        os.makedirs(layouts_dir, exist_ok=True)
+
+    def _path(self, fp):
+        return os.path.join(self.layouts_dir, f'{fp}.json')
+
+    def get(self, fp):
+        try:
+            with open(self._path(fp), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, fp, template):
+        p = self._path(fp)
+        if not os.path.exists(p):
+            known = sum(1 for n in os.listdir(self.layouts_dir) if n.endswith('.json'))
+            if known >= self.max_templates:
+                return
+        tmp = f'{p}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(template, f)
+        os.replace(tmp, p)
+
+
+def extract_page_tables(page, store, table_settings=None):
+    '''
+    Mesmo resultado de page.extract_tables(). Num formulário já conhecido
+    cujas tabelas ficam em blocos de réguas separados, a detecção roda
+    bloco a bloco dentro da faixa horizontal das tabelas do template, e
+    não na página inteira; o número de linhas de cada tabela, e de
+    tabelas, pode variar. Réguas fora dessa faixa voltam à página inteira.
+    Formulário novo (ou template de versão antiga) cai na detecção da
+    página inteira, confere se a detecção por blocos daria o mesmo
+    resultado e grava o template.
+    '''
+    settings = table_settings or {}
+    tset = TableSettings.resolve(settings)
+    text_settings = tset.text_settings or {}
+    fp = page_fingerprint(page)
+    template = store.get(fp)
+    if isinstance(template, dict) and template.get('settings') == settings:
+        bbox = template['bbox']
+        # régua fora das tabelas do template: a página tem algo que ele não previu
+        inside = bbox and all(bbox[0] - GRID <= o['x0'] and o['x1'] <= bbox[1] + GRID
+                              for o in _shapes(page))
+        if template['blocks'] and inside:
+            found = _find_in_blocks(page, tset, bbox)
+        else:
+            found = page.find_tables(tset)
+        return [t.extract(**text_settings) for t in found]
+    found = page.find_tables(tset)
+    tables = [t.extract(**text_settings) for t in found]
+    bbox = None
+    if found:
+        bbox = [min(t.bbox[0] for t in found), max(t.bbox[2] for t in found)]
+    blocks = bool(found) and [t.extract(**text_settings)
+                              for t in _find_in_blocks(page, tset, bbox)] == tables
+    store.put(fp, {'settings': settings, 'bbox': bbox, 'blocks': blocks,
+                   'tables': [list(t.bbox) for t in found]})
+    return tables
@@ -0,0 +1,143 @@
+import os
+import json
+import hashlib
+
+import pandas as pd
+
+from pdf_cache import file_sha256
+
+
+class Manifest:
+    '''
+    Registro dos PDFs já processados (tamanho, mtime, hash, linhas e onde
+    estão as linhas compiladas). As linhas de cada PDF ficam num pickle em
+    parts_dir, e a saída compilada é remontada a partir deles.
+    '''
+
+    def __init__(self, path, parts_dir, version):
+        self.path = path
+        self.parts_dir = parts_dir
+        self.version = version
+        self.files = {}
+        # saídas que não acompanharam as últimas atualizações e precisam ser refeitas
+        self.stale = []
+        self._digests = {}
+        self._fingerprints = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            # extrator ou compilação mudaram: tudo precisa ser refeito
+            if data.get('version') == version:
+                self.files = data.get('files', {})
+                self.stale = data.get('stale', [])
+        os.makedirs(parts_dir, exist_ok=True)
+
+    def digest(self, path):
+        '''
+        sha256 do PDF, reaproveitando o do manifesto se tamanho/mtime não mudaram.
+        '''
+        st = os.stat(path)
+        entry = self.files.get(path)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return entry['sha256']
+        if path not in self._digests:
+            self._digests[path] = (file_sha256(path), st)
+        return self._digests[path][0]
+
+    def fingerprint(self, path, fn):
+        '''
+        fn(path) guardado na entrada do PDF (por nome de fn), recalculado
+        só quando o conteúdo muda.
+        '''
+        entry = self.files.get(path)
+        known = entry.get('fingerprints', {}) if entry else {}
+        if fn.__name__ in known and entry['sha256'] == self.digest(path):
+            return known[fn.__name__]
+        value = fn(path)
+        self._fingerprints.setdefault(path, {})[fn.__name__] = value
+        return value
+
+    def changed(self, pdfs, aliases=None):
+        '''
+        PDFs novos ou alterados. Só calcula o hash quando tamanho/mtime mudam.
+        Com aliases ({PDF: [ele e suas cópias]}), também volta o PDF cujo
+        grupo de cópias mudou ou que antes era cópia de outro.
+        '''
+        aliases = aliases or {}
+        todo = []
+        for p in pdfs:
+            st = os.stat(p)
+            entry = self.files.get(p)
+            if entry and (entry.get('alias_of') or entry.get('aliases', []) != aliases.get(p, [])):
+                todo.append(p)
+                continue
+            if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+                continue
+            digest = self._digests[p][0] if p in self._digests else file_sha256(p)
+            if entry and entry['sha256'] == digest:
+                entry['mtime_ns'] = st.st_mtime_ns
+                continue
+            self._digests[p] = (digest, st)
+            todo.append(p)
+        return todo
+
+    def removed(self, pdfs):
+        present = set(pdfs)
+        return [p for p in self.files if p not in present]
+
+    def _part_path(self, path):
+        name = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.parts_dir, f'{name}.pkl')
+
+    def record(self, path, df=None, error=None, aliases=None, alias_of=None):
+        '''
+        Grava as linhas de um PDF processado. Com error, registra a falha
+        sem linhas: o arquivo só é tentado de novo quando mudar. aliases é
+        o grupo de cópias do PDF; alias_of marca uma cópia, que não tem linhas.
+        '''
+        digest, st = self._digests.pop(path, None) or (file_sha256(path), os.stat(path))
+        old = self.files.get(path, {})
+        fingerprints = dict(old.get('fingerprints', {}) if old.get('sha256') == digest else {})
+        fingerprints.update(self._fingerprints.pop(path, {}))
+        part = self._part_path(path)
+        if df is not None:
+            df.to_pickle(part)
+        elif os.path.exists(part):
+            os.remove(part)
+        self.files[path] = {
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': digest,
+            'rows': int(df.shape[0]) if df is not None else 0,
+            'part': part if df is not None else None,
+        }
+        if error:
+            self.files[path]['error'] = error
+        if aliases:
+            self.files[path]['aliases'] = aliases
+        if alias_of:
+            self.files[path]['alias_of'] = alias_of
+        if fingerprints:
+            self.files[path]['fingerprints'] = fingerprints
+
+    def drop(self, path):
+        entry = self.files.pop(path, None)
+        self._digests.pop(path, None)
+        if entry and entry['part'] and os.path.exists(entry['part']):
+            os.remove(entry['part'])
+
+    def frames(self, paths=None):
+        '''
+        Linhas compiladas de cada PDF (ou só dos de paths), uma de cada
+        vez, em ordem de caminho.
+        '''
+        for p in sorted(self.files if paths is None else paths):
+            if self.files.get(p, {}).get('part'):
+                yield pd.read_pickle(self.files[p]['part'])
+
+    def save(self):
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'files': self.files, 'stale': self.stale}, f,
+                      indent=1)
+        os.replace(tmp, self.path)
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+
+_last_stage = None
+_stage_hook = None
+# estágios abertos pelo Metrics, do mais externo ao atual
+_open_stages = []
+
+
+def rss_mb(pid=None):
+    '''
+    RSS do processo (o atual, por padrão) em MB; None se a plataforma não informar.
+    '''
+    try:
+        with open(f'/proc/{pid or "self"}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 2**20
+    except Exception:
+        return None
+
+
+def group_rss_mb(pgid):
+    '''
+    Soma do RSS (MB) dos processos do grupo pgid: um worker que é líder
+    do próprio grupo mais os filhos que ele abriu (ex.: --page-workers).
+    None se a plataforma não informar.
+    '''
+    if os.path.isdir('/proc'):
+        total = 0
+        found = False
+        for name in os.listdir('/proc'):
+            if not name.isdigit():
+                continue
+            try:
+                with open(f'/proc/{name}/stat') as f:
+                    # o nome do processo (2º campo) pode ter espaços; o grupo vem depois do ")"
+                    if int(f.read().rsplit(')', 1)[1].split()[2]) != pgid:
+                        continue
+            except (OSError, ValueError, IndexError):
+                continue
+            rss = rss_mb(int(name))
+            if rss is not None:
+                total += rss
+                found = True
+        if found:
+            return total
+    try:
+        import psutil
+        proc = psutil.Process(pgid)
+        return sum(p.memory_info().rss for p in [proc] + proc.children(recursive=True)) / 2**20
+    except Exception:
+        return None
+
+
+def enter_stage(name):
+    '''
+    Marca o estágio em andamento (mesmo com a instrumentação desligada),
+    para o relatório de falhas saber onde um PDF morreu.
+    '''
+    global _last_stage
+    _last_stage = name
+    if _stage_hook:
+        _stage_hook(name)
+
+
+def last_stage():
+    return _last_stage
+
+
+def open_stages():
+    '''
+    Estágios do Metrics em andamento agora, do mais externo ao mais interno.
+    '''
+    return tuple(_open_stages)
+
+
+def set_stage_hook(fn):
+    '''
+    fn(nome) é chamado a cada estágio iniciado; usado pelos workers
+    isolados para avisar o processo principal.
+    '''
+    global _stage_hook
+    _stage_hook = fn
+
+
+class Metrics:
+    '''
+    Coleta tempos por estágio de um PDF. Cada stage() vira um evento com
+    duração, delta de RSS e os campos extras (página, tabelas, linhas...).
+    '''
+
+    def __init__(self, pdf=None):
+        self.pdf = pdf
+        self.events = []
+        self.current = None
+
+    @contextmanager
+    def stage(self, name, **fields):
+        enter_stage(name)
+        _open_stages.append(name)
+        rss0 = rss_mb()
+        t0 = time.perf_counter()
+        outer, self.current = self.current, name
+        error = None
+        try:
+            yield fields
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _open_stages.pop()
+            self.current = outer
+            rss1 = rss_mb()
+            event = {'pdf': self.pdf, 'stage': name,
+                     'ms': round((time.perf_counter() - t0) * 1000, 3)}
+            if rss0 is not None and rss1 is not None:
+                event['rss_delta_mb'] = round(rss1 - rss0, 3)
+            event.update(fields)
+            if error:
+                event['error'] = error
+            self.events.append(event)
+
+
+class NullMetrics:
+    '''
+    Metrics que não faz nada; é o padrão quando a instrumentação está desligada.
+    '''
+    current = None
+    events = ()
+
+    def stage(self, name, **fields):
+        enter_stage(name)
+        return nullcontext(fields)
+
+
+NULL_METRICS = NullMetrics()
+
+
+class MetricsLog:
+    '''
+    Grava os eventos em JSON lines e, no close(), um resumo com os PDFs e
+    estágios mais lentos.
+    '''
+
+    def __init__(self, path, top=10):
+        self.path = path
+        self.top = top
+        self._file = open(path, 'w', encoding='utf-8')
+        self._pdf_ms = {}
+        self._stage_ms = {}
+
+    def add(self, events):
+        for e in events:
+            self._file.write(json.dumps(e, ensure_ascii=False) + '\n')
+            if e['stage'] == 'pdf':
+                self._pdf_ms[e['pdf']] = e['ms']
+            else:
+                self._stage_ms[e['stage']] = self._stage_ms.get(e['stage'], 0) + e['ms']
+
+    def summary(self):
+        slow_pdfs = sorted(self._pdf_ms.items(), key=lambda kv: -kv[1])[:self.top]
+        stages = sorted(self._stage_ms.items(), key=lambda kv: -kv[1])
+        return {
+            'pdfs': len(self._pdf_ms),
+            'total_ms': round(sum(self._pdf_ms.values()), 3),
+            'slowest_pdfs': [{'pdf': p, 'ms': ms} for p, ms in slow_pdfs],
+            'stages_ms': {s: round(ms, 3) for s, ms in stages},
+        }
+
+    def close(self):
+        summary = self.summary()
+        self._file.write(json.dumps({'summary': summary}, ensure_ascii=False) + '\n')
+        self._file.close()
+        print(f'Metrics saved to {self.path}')
+        print('Slowest PDFs:')
+        for item in summary['slowest_pdfs']:
+            print(f"  {item['ms']:10.1f} ms  {item['pdf']}")
+        print('Time by stage:')
+        for stage, ms in summary['stages_ms'].items():
+            print(f'  {ms:10.1f} ms  {stage}')
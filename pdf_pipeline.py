@@ -0,0 +1,163 @@
+'''
+Pipeline para usar de dentro de outros programas, sem a linha de comando:
+fonte de PDFs -> extrator (read_pdf) -> compilador (compile_tables) -> sinks.
+
+    from pdf_pipeline import Pipeline
+    from pdf_sinks import build_sinks
+    from pdf_reader_igor_test import compile_tables, deduplicate_columns
+
+    pipe = Pipeline(compile_tables, dedupe=deduplicate_columns, workers=4)
+    for batch in pipe.batches('entrada/'):       # um BatchResult por PDF
+        if batch.error is None:
+            enviar(batch.frame)
+    for row in pipe.records(['a.pdf', 'b.pdf']):  # uma linha (dict) por vez
+        ...
+    pipe.run('entrada/', build_sinks(['sqlite'], 'saida'))
+
+batches, frames e records são geradores: cada PDF é lido e compilado só
+quando o anterior foi consumido (com workers > 1, só os que estão nos
+workers), então a memória não cresce com o tamanho do lote.
+'''
+import os
+import glob
+
+from pdf_batch import iter_batch, make_task, print_failure, run_batch, run_incremental
+from pdf_dedupe import find_duplicates, source_labels
+from pdf_extract import read_pdf as default_read_pdf
+from pdf_headers import configure as configure_headers
+from pdf_pool import SupervisedPool
+from pdf_sinks import unique_names
+
+
+def pdf_source(source, pattern='*.pdf'):
+    '''
+    Caminhos dos PDFs de uma pasta ou de um glob (ordenados), ou os de
+    qualquer iterável de caminhos, na ordem dele e sem materializá-lo.
+    '''
+    if isinstance(source, (str, os.PathLike)):
+        source = os.fspath(source)
+        if os.path.isdir(source):
+            source = os.path.join(source, pattern)
+        yield from sorted(glob.glob(source))
+    else:
+        yield from source
+
+
+class Pipeline:
+    '''
+    Extrator, compilador e opções do lote num objeto só; os mesmos
+    parâmetros da linha de comando (veja pdf_cli). compile_tables pode ser
+    o de um dos leitores ou partial(compile_strategies, ...), que devolve
+    {estratégia: DataFrame}.
+    '''
+
+    def __init__(self, compile_tables, read_pdf=default_read_pdf, dedupe=None, workers=1,
+                 cache=None, read_opts=None, header_rules=None, timeout=None, max_memory_mb=None,
+                 dedupe_docs='hash', classify=True, compact=False, metrics_log=None):
+        self.compile_tables = compile_tables
+        self.read_pdf = read_pdf
+        self.dedupe = dedupe
+        self.workers = workers
+        self.cache = cache
+        self.read_opts = read_opts
+        self.header_rules = header_rules
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.dedupe_docs = dedupe_docs
+        self.classify = classify
+        self.compact = compact
+        self.metrics_log = metrics_log
+
+    def _batch_opts(self):
+        return dict(workers=self.workers, cache=self.cache, read_opts=self.read_opts,
+                    header_rules=self.header_rules, timeout=self.timeout,
+                    max_memory_mb=self.max_memory_mb, classify=self.classify)
+
+    def task(self, **overrides):
+        '''
+        process_pdf com as opções do pipeline (overrides troca alguma).
+        '''
+        opts = dict(cache=self.cache, read_opts=self.read_opts, measure=bool(self.metrics_log),
+                    classify=self.classify, compact=self.compact)
+        opts.update(overrides)
+        return make_task(self.read_pdf, self.compile_tables, **opts)
+
+    def pool(self):
+        '''
+        SupervisedPool (ainda não iniciado) com a task do pipeline, para
+        manter os workers aquecidos entre várias chamadas com pool=.
+        '''
+        return SupervisedPool(self.task(), workers=self.workers, timeout=self.timeout,
+                              max_memory_mb=self.max_memory_mb, initializer=configure_headers,
+                              initargs=(self.header_rules,))
+
+    def batches(self, source, pool=None):
+        '''
+        Um BatchResult por PDF da fonte, na ordem dela, inclusive as falhas
+        (error/reason/stage preenchidos). Com dedupe_docs diferente de
+        'off' a fonte é lida inteira antes, para achar as cópias.
+        '''
+        pdfs = pdf_source(source)
+        labels = None
+        if self.dedupe_docs != 'off':
+            pdfs, aliases = find_duplicates(list(pdfs), self.dedupe_docs)
+            labels = source_labels(aliases)
+        for res in iter_batch(pdfs, self.read_pdf, self.compile_tables,
+                              measure=bool(self.metrics_log), labels=labels,
+                              compact=self.compact, pool=pool, **self._batch_opts()):
+            if self.metrics_log:
+                self.metrics_log.add(res.events)
+            yield res
+
+    def frames(self, source, pool=None):
+        '''
+        Só os DataFrames dos PDFs que deram certo; as falhas são impressas.
+        '''
+        for res in self.batches(source, pool=pool):
+            if res.error:
+                print_failure(res)
+            else:
+                yield res.frame
+
+    def records(self, source, strategy=None, pool=None):
+        '''
+        Uma linha por vez, como dict {coluna: valor} com as colunas já
+        passadas pelo dedupe (sem ele, repetidas viram PLANTE.1, ...). Com
+        várias estratégias, strategy escolhe de qual delas vêm as linhas (e
+        o dedupe, se for um dict por estratégia).
+        '''
+        dedupe = self.dedupe
+        if isinstance(dedupe, dict):
+            dedupe = dedupe.get(strategy)
+        for frame in self.frames(source, pool=pool):
+            if isinstance(frame, dict):
+                if strategy not in frame:
+                    raise ValueError(f'records() precisa de strategy= entre {sorted(frame)}, '
+                                     f'não {strategy!r}')
+                frame = frame[strategy]
+            if frame.empty:
+                continue
+            columns = unique_names(dedupe(frame.columns) if dedupe else frame.columns)
+            for row in frame.itertuples(index=False, name=None):
+                yield dict(zip(columns, row))
+
+    def run(self, source, sinks, checkpoint=None):
+        '''
+        Execução completa para os sinks (pdf_batch.run_batch); devolve as falhas.
+        '''
+        return run_batch(list(pdf_source(source)), self.read_pdf, self.compile_tables, sinks,
+                         dedupe=self.dedupe, metrics_log=self.metrics_log, checkpoint=checkpoint,
+                         dedupe_docs=self.dedupe_docs, compact=self.compact,
+                         **self._batch_opts())
+
+    def run_incremental(self, source, sinks, manifest, checkpoint_every=100, pool=None,
+                        append=False):
+        '''
+        Só os PDFs novos/alterados em relação ao manifesto (pdf_batch.run_incremental);
+        com append, os sinks são atualizados em vez de reescritos.
+        '''
+        return run_incremental(list(pdf_source(source)), self.read_pdf, self.compile_tables,
+                               sinks, manifest, dedupe=self.dedupe, metrics_log=self.metrics_log,
+                               checkpoint_every=checkpoint_every, dedupe_docs=self.dedupe_docs,
+                               compact=self.compact, append=append, pool=pool,
+                               **self._batch_opts())
@@ -0,0 +1,230 @@
+import os
+import time
+import signal
+import traceback
+import multiprocessing as mp
+from multiprocessing.connection import wait
+
+from pdf_metrics import group_rss_mb, set_stage_hook
+
+# Intervalo (s) entre checagens de tempo/memória dos workers.
+POLL = 0.2
+
+
+class TaskFailure(Exception):
+    '''
+    Falha de um item detectada pelo supervisor (timeout, memória, crash).
+    reason: 'timeout' | 'memory' | 'crash'; stage: último estágio informado.
+    '''
+
+    def __init__(self, reason, message, stage=None, elapsed=None):
+        super().__init__(message)
+        self.reason = reason
+        self.stage = stage
+        self.elapsed = elapsed
+
+
+def _worker_main(conn, stage_buf, task, initializer, initargs):
+    # grupo de processos próprio: o supervisor mata o worker junto com os
+    # processos que ele abrir (ex.: faixas de páginas do --page-workers)
+    if hasattr(os, 'setsid'):
+        os.setsid()
+    if initializer:
+        initializer(*initargs)
+
+    def report(name):
+        stage_buf.value = (name or '').encode('utf-8')[:63]
+
+    set_stage_hook(report)
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            break
+        if item is None:
+            break
+        report(None)
+        try:
+            result = ('ok', task(item))
+        except BaseException:
+            result = ('error', traceback.format_exc())
+        conn.send(result)
+
+
+class _Worker:
+    def __init__(self, ctx, task, initializer, initargs):
+        self.conn, child = ctx.Pipe()
+        self.stage_buf = ctx.Array('c', 64)
+        self.proc = ctx.Process(target=_worker_main,
+                                args=(child, self.stage_buf, task, initializer, initargs))
+        self.proc.start()
+        child.close()
+        self.job = None
+        self.started = None
+
+    @property
+    def stage(self):
+        return self.stage_buf.value.decode('utf-8', 'replace') or None
+
+    def submit(self, idx, item):
+        self.job = (idx, item)
+        self.started = time.monotonic()
+        self.conn.send(item)
+
+    def _kill_group(self):
+        try:
+            os.killpg(self.proc.pid, signal.SIGKILL)
+        except (AttributeError, OSError):
+            # sem killpg, ou o worker ainda não virou líder do grupo (sem filhos)
+            if self.proc.is_alive():
+                self.proc.kill()
+
+    def kill(self):
+        # mesmo com o worker já morto, os filhos dele podem continuar no grupo
+        self._kill_group()
+        self.proc.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.proc.join(1)
+        if self.proc.is_alive():
+            self._kill_group()
+            self.proc.join()
+        self.conn.close()
+
+
+class SupervisedPool:
+    '''
+    Pool de processos em que cada item roda isolado: se um worker passa de
+    timeout segundos ou de max_memory_mb de RSS (somado ao dos processos
+    que ele abriu), ou morre (segfault, OOM killer...), só aquele item
+    falha com TaskFailure; o worker e seus filhos são mortos, ele é
+    trocado por um novo e o lote segue.
+    '''
+
+    def __init__(self, task, workers=1, timeout=None, max_memory_mb=None,
+                 initializer=None, initargs=()):
+        self.task = task
+        self.n_workers = max(1, workers)
+        self.timeout = timeout
+        self.max_memory_mb = max_memory_mb
+        self.initializer = initializer
+        self.initargs = initargs
+        self._ctx = mp.get_context()
+        self._workers = None
+
+    def _spawn(self):
+        return _Worker(self._ctx, self.task, self.initializer, self.initargs)
+
+    def start(self):
+        '''
+        Sobe os workers e os mantém entre chamadas de imap (pool aquecido).
+        '''
+        if self._workers is None:
+            self._workers = [self._spawn() for _ in range(self.n_workers)]
+        return self
+
+    def close(self):
+        if self._workers is not None:
+            self._shutdown(self._workers)
+            self._workers = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _shutdown(workers):
+        for w in workers:
+            if w.job is not None:
+                w.kill()
+            else:
+                w.stop()
+
+    def _check_limits(self, w, now):
+        elapsed = now - w.started
+        if self.timeout and elapsed > self.timeout:
+            return TaskFailure('timeout', f'TimeoutError: exceeded {self.timeout}s', w.stage, elapsed)
+        if self.max_memory_mb:
+            rss = group_rss_mb(w.proc.pid)
+            if rss is not None and rss > self.max_memory_mb:
+                return TaskFailure('memory', f'MemoryError: RSS {rss:.0f} MB above '
+                                             f'{self.max_memory_mb} MB', w.stage, elapsed)
+        return None
+
+    def imap(self, items):
+        '''
+        Devolve (item, resultado de task(item) ou um TaskFailure) para cada
+        item, na ordem de entrada. items é lido aos poucos (pode não ter
+        fim): no máximo 2 * workers itens à frente do próximo a ser entregue.
+        '''
+        todo = enumerate(items)
+        # sem start(), os workers vivem só durante esta chamada
+        persistent = self._workers is not None
+        workers = self._workers if persistent else [self._spawn() for _ in range(self.n_workers)]
+        done = {}
+        next_out = 0
+        next_in = 0
+        exhausted = False
+        try:
+            while True:
+                for w in workers:
+                    if w.job is None and not exhausted and next_in < next_out + 2 * self.n_workers:
+                        try:
+                            idx, item = next(todo)
+                        except StopIteration:
+                            exhausted = True
+                            break
+                        w.submit(idx, item)
+                        next_in = idx + 1
+                while next_out in done:
+                    yield done.pop(next_out)
+                    next_out += 1
+                busy = [w for w in workers if w.job is not None]
+                if not busy:
+                    if exhausted:
+                        break
+                    continue
+                ready = wait([w.conn for w in busy] + [w.proc.sentinel for w in busy], POLL)
+                now = time.monotonic()
+                for i, w in enumerate(workers):
+                    if w.job is None:
+                        continue
+                    idx, item = w.job
+                    failure = None
+                    if w.conn in ready:
+                        try:
+                            status, payload = w.conn.recv()
+                        except (EOFError, OSError):
+                            status = None
+                        if status == 'ok':
+                            done[idx] = (item, payload)
+                            w.job = None
+                            continue
+                        if status == 'error':
+                            failure = TaskFailure('crash', payload.strip().splitlines()[-1],
+                                                  w.stage, now - w.started)
+                    if failure is None and not w.proc.is_alive():
+                        failure = TaskFailure('crash', f'WorkerCrash: exit code {w.proc.exitcode}',
+                                              w.stage, now - w.started)
+                    if failure is None:
+                        failure = self._check_limits(w, now)
+                    if failure is not None:
+                        w.kill()
+                        done[idx] = (item, failure)
+                        workers[i] = self._spawn()
+        finally:
+            if persistent:
+                # itens abandonados no meio (gerador fechado) não podem voltar depois
+                for i, w in enumerate(workers):
+                    if w.job is not None:
+                        w.kill()
+                        workers[i] = self._spawn()
+            else:
+                self._shutdown(workers)
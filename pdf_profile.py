@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter, defaultdict
+
+from pdf_metrics import open_stages
+
+
+def sample_pdfs(pdfs, n):
+    '''
+    n PDFs espalhados pela lista (primeiro, último e os do meio).
+    '''
+    if n >= len(pdfs):
+        return list(pdfs)
+    if n <= 1:
+        return list(pdfs[:1])
+    step = (len(pdfs) - 1) / (n - 1)
+    return [pdfs[round(i * step)] for i in range(n)]
+
+
+def _frame_name(code):
+    path = code.co_filename
+    if 'site-packages' in path:
+        path = path.split('site-packages' + os.sep, 1)[1]
+    else:
+        path = os.path.basename(path)
+    return f'{path}:{code.co_name}'
+
+
+class StackSampler(threading.Thread):
+    '''
+    Amostra a pilha de uma thread a cada interval segundos, junto com os
+    estágios do Metrics abertos naquele instante. Também guarda o maior
+    uso de memória do tracemalloc visto em cada estágio, se estiver ligado.
+    '''
+
+    def __init__(self, thread_id=None, interval=0.005):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.stacks = Counter()
+        self.peak_by_stage = defaultdict(int)
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stages = open_stages()
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            self.stacks[(stages, tuple(reversed(stack)))] += 1
+            if tracemalloc.is_tracing() and stages:
+                current = tracemalloc.get_traced_memory()[0]
+                if current > self.peak_by_stage[stages[-1]]:
+                    self.peak_by_stage[stages[-1]] = current
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+    def by_stage(self):
+        '''
+        {estágio mais interno: Counter(função do topo da pilha -> amostras)}.
+        '''
+        out = defaultdict(Counter)
+        for (stages, stack), n in self.stacks.items():
+            out[stages[-1] if stages else '<outside>'][stack[-1]] += n
+        return out
+
+    def write_folded(self, path):
+        '''
+        Pilhas no formato "a;b;c contagem" (flamegraph.pl, speedscope,
+        inferno), com os estágios do pipeline como primeiros quadros.
+        '''
+        with open(path, 'w', encoding='utf-8') as f:
+            for (stages, stack), n in sorted(self.stacks.items()):
+                frames = [f'[{s}]' for s in stages] + list(stack)
+                f.write(';'.join(frames) + f' {n}\n')
+
+
+def profile_pdfs(pdfs, task, out_stem, interval=0.005, top=15):
+    '''
+    Roda task(pdf) (process_pdf com measure=True) nos PDFs dentro do
+    processo atual com cProfile, tracemalloc e o StackSampler. Grava
+    <out_stem>.profile.txt (relatório), .profile.folded (flamegraph) e
+    .profile.pstats (cProfile, para snakeviz/pstats).
+    '''
+    events = []
+    profiler = cProfile.Profile()
+    sampler = StackSampler(interval=interval)
+    tracemalloc.start(10)
+    sampler.start()
+    t0 = time.perf_counter()
+    try:
+        for p in pdfs:
+            profiler.enable()
+            try:
+                res = task(p)
+            finally:
+                profiler.disable()
+            events += res.events
+            if res.error:
+                print(f'Failed {res.path}: {res.error.strip().splitlines()[-1]}')
+    finally:
+        elapsed = time.perf_counter() - t0
+        sampler.stop()
+        # sem as alocações do próprio amostrador
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    report = f'{out_stem}.profile.txt'
+    folded = f'{out_stem}.profile.folded'
+    stats_path = f'{out_stem}.profile.pstats'
+    sampler.write_folded(folded)
+    profiler.dump_stats(stats_path)
+
+    stage_ms = Counter()
+    for e in events:
+        stage_ms[e['stage']] += e['ms']
+    samples = sum(sampler.stacks.values())
+    with open(report, 'w', encoding='utf-8') as f:
+        f.write(f'Profiled {len(pdfs)} PDF(s) in {elapsed:.2f}s '
+                f'({samples} samples every {interval * 1000:.0f} ms; '
+                f'cProfile and tracemalloc add overhead)\n\n')
+        f.write('Time by stage (Metrics, nested stages included in their parents):\n')
+        for stage, ms in stage_ms.most_common():
+            f.write(f'  {ms:10.1f} ms  {stage}\n')
+        f.write('\nHot functions by stage (sampled, innermost frame):\n')
+        for stage, funcs in sorted(sampler.by_stage().items(), key=lambda kv: -sum(kv[1].values())):
+            total = sum(funcs.values())
+            f.write(f'  [{stage}] {total} samples ({total * 100 / max(samples, 1):.0f}%)\n')
+            for func, n in funcs.most_common(5):
+                f.write(f'    {n * 100 / total:5.1f}%  {func}\n')
+        f.write(f'\nMemory: peak traced {peak / 2**20:.1f} MB\n')
+        for stage, b in sorted(sampler.peak_by_stage.items(), key=lambda kv: -kv[1]):
+            f.write(f'  {b / 2**20:10.1f} MB  peak during {stage}\n')
+        f.write(f'\nTop {top} allocation sites still alive at the end:\n')
+        for stat in snapshot.statistics('lineno')[:top]:
+            frame = stat.traceback[0]
+            f.write(f'  {stat.size / 1024:10.1f} KB  {stat.count:7d} blocks  '
+                    f'{frame.filename}:{frame.lineno}\n')
+        f.write(f'\ncProfile, top {top} by cumulative time:\n')
+        stats = pstats.Stats(profiler, stream=f)
+        stats.sort_stats('cumulative').print_stats(top)
+        f.write(f'cProfile, top {top} by own time:\n')
+        stats.sort_stats('tottime').print_stats(top)
+    for path in (report, folded, stats_path):
+        print(f'Profile saved to {path}')
+    return report
@@ -0,0 +1,108 @@
+'''
+Consulta o banco gerado com --format sqlite sem abrir o Excel.
+
+    python pdf_query.py --sap-cofor 12345678
+    python pdf_query.py --supplier "ACME LTDA" --columns source_pdf,PART,QTY
+'''
+import os
+import sys
+import csv
+import time
+import sqlite3
+import argparse
+
+from pdf_dedupe import LABEL_SEP, doc_id
+from pdf_sinks import SQLITE_KEYS, SQLITE_TABLE, sql_name, sqlite_key
+
+
+def key_columns(conn, table=SQLITE_TABLE):
+    '''
+    {chave de consulta: [colunas da tabela com essa chave]}.
+    '''
+    keys = {}
+    for r in conn.execute(f'PRAGMA table_info({sql_name(table)})'):
+        key = sqlite_key(r[1])
+        if key:
+            keys.setdefault(key, []).append(r[1])
+    return keys
+
+
+def pdf_doc_ids(conn, name, table=SQLITE_TABLE):
+    '''
+    doc_ids do PDF pelo nome: o próprio, se foi o extraído, e os dos
+    documentos de que ele é cópia (listado no source_pdf 'a.pdf; b.pdf').
+    A busca pelas cópias só lê o índice de source_pdf.
+    '''
+    name = os.path.basename(name)
+    labels = conn.execute(f'SELECT DISTINCT source_pdf FROM {sql_name(table)} '
+                          f'WHERE instr(? || source_pdf || ?, ?) > 0',
+                          (LABEL_SEP, LABEL_SEP, f'{LABEL_SEP}{name}{LABEL_SEP}'))
+    return sorted({name} | {doc_id(label) for (label,) in labels})
+
+
+def query(conn, filters, columns=None, limit=None, table=SQLITE_TABLE):
+    '''
+    Linhas em que, para cada filtro {chave: valor}, alguma coluna daquela
+    chave (SAP/COFOR, SAP/COFOR.1, ...) é igual ao valor. Cada coluna tem
+    índice, então o SQLite resolve o OR por índice, sem varrer a tabela.
+    O filtro de PDF vai pelo doc_id (indexado) e também acha as cópias de
+    um documento deduplicado. Devolve (nomes das colunas, cursor).
+    '''
+    keys = key_columns(conn, table)
+    where = []
+    params = []
+    for key, value in filters.items():
+        if key == SQLITE_KEYS['source_pdf']:
+            docs = pdf_doc_ids(conn, value, table)
+            where.append(f'doc_id IN ({", ".join("?" * len(docs))})')
+            params += docs
+            continue
+        cols = keys.get(key)
+        if not cols:
+            raise ValueError(f'No column for {key!r} in {table}')
+        where.append('(' + ' OR '.join(f'{sql_name(c)} = ?' for c in cols) + ')')
+        params += [value] * len(cols)
+    select = ', '.join(sql_name(c) for c in columns) if columns else '*'
+    sql = f'SELECT {select} FROM {sql_name(table)}'
+    if where:
+        sql += ' WHERE ' + ' AND '.join(where)
+    if limit:
+        sql += f' LIMIT {int(limit)}'
+    cur = conn.execute(sql, params)
+    return [d[0] for d in cur.description], cur
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Consulta o SQLite dos PDFs CID compilados.')
+    parser.add_argument('db', nargs='?', default='compiled_output.sqlite')
+    for name in SQLITE_KEYS.values():
+        parser.add_argument(f'--{name.replace("_", "-")}', dest=name, metavar='VALOR')
+    parser.add_argument('--columns', help='colunas a mostrar, separadas por vírgula')
+    parser.add_argument('--limit', type=int)
+    args = parser.parse_args(argv)
+
+    filters = {k: getattr(args, k) for k in SQLITE_KEYS.values() if getattr(args, k) is not None}
+    columns = [c.strip() for c in args.columns.split(',')] if args.columns else None
+    t0 = time.perf_counter()
+    conn = None
+    try:
+        conn = sqlite3.connect(f'file:{args.db}?mode=ro', uri=True)
+        names, cur = query(conn, filters, columns, args.limit)
+        w = csv.writer(sys.stdout)
+        w.writerow(names)
+        n = 0
+        for row in cur:
+            w.writerow(row)
+            n += 1
+    except (sqlite3.Error, ValueError) as e:
+        print(f'Error: {e}', file=sys.stderr)
+        return 1
+    finally:
+        if conn is not None:
+            conn.close()
+    print(f'{n} row(s) in {(time.perf_counter() - t0) * 1000:.1f} ms', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,535 @@
+import os
+import re
+import csv
+import glob
+import pickle
+import shutil
+import sqlite3
+import tempfile
+from datetime import date
+from itertools import islice
+from urllib.parse import quote, unquote
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+
+from pdf_dedupe import doc_id
+from pdf_headers import canonical_header
+
+
+FORMATS = ('xlsx', 'parquet', 'arrow', 'csv', 'sqlite')
+BATCH_ROWS = 10000
+
+# colunas indexadas no SQLite: nome canônico do cabeçalho -> chave de consulta
+SQLITE_KEYS = {
+    'source_pdf': 'pdf',
+    'SAP/COFOR': 'sap_cofor',
+    'SUPPLIER NAME': 'supplier',
+    'CAPACITY INCREASE DATE': 'capacity_date',
+    'SOP DATE': 'sop_date',
+}
+SQLITE_TABLE = 'records'
+
+
+def _batches(rows, size=BATCH_ROWS):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError('Parquet/Arrow precisam do pyarrow: pip install pyarrow') from None
+    return pyarrow
+
+
+def unique_names(columns):
+    '''
+    Parquet/Arrow não aceitam nomes repetidos: PLANTE, PLANTE.1, ...
+    '''
+    seen = {}
+    result = []
+    for c in columns:
+        name = base = str(c)
+        while name in seen:
+            seen[base] += 1
+            name = f'{base}.{seen[base]}'
+        seen.setdefault(name, 0)
+        result.append(name)
+    return result
+
+
+def _align(columns, target):
+    '''
+    Posição em target de cada coluna (nomes repetidos casam pela ordem de
+    ocorrência), ou None se alguma coluna não existe em target.
+    '''
+    pos = {c: i for i, c in enumerate(unique_names(target))}
+    idx = [pos.get(c) for c in unique_names(columns)]
+    return None if None in idx else idx
+
+
+def _aligned_rows(rows, idx, width):
+    for r in rows:
+        out = [None] * width
+        for i, v in zip(idx, r):
+            out[i] = v
+        yield out
+
+
+def _text_value(v):
+    '''
+    Valor como os sinks só de texto (CSV, SQLite, Parquet/Arrow) gravam:
+    datas do --compact voltam ao dd/mm/aaaa do PDF, para a saída e os
+    filtros do pdf_query não mudarem com --compact.
+    '''
+    if v is None:
+        return None
+    if isinstance(v, date):
+        return v.strftime('%d/%m/%Y')
+    return str(v)
+
+
+def _text_rows(rows):
+    for r in rows:
+        yield [_text_value(v) for v in r]
+
+
+def _arrow_schema(pa, columns):
+    '''
+    Schema único para Parquet e Arrow: todas as colunas como texto.
+    '''
+    return pa.schema([pa.field(c, pa.string()) for c in unique_names(columns)])
+
+
+def _arrow_batch(pa, schema, chunk):
+    cols = list(zip(*chunk)) if chunk else [()] * len(schema)
+    arrays = [pa.array([_text_value(v) for v in col], type=pa.string())
+              for col in cols]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class RowSpool:
+    '''
+    Guarda em disco as linhas de cada PDF assim que chegam, mantendo a
+    união das colunas. Nomes repetidos no mesmo DataFrame viram colunas
+    distintas (1ª ocorrência, 2ª ocorrência...), como no pd.concat. Com
+    drop_empty, colunas sem nenhum valor em nenhum PDF ficam de fora.
+    '''
+
+    def __init__(self, dedupe=None, drop_empty=False):
+        self.dedupe = dedupe
+        self.drop_empty = drop_empty
+        self._keys = []
+        self._pos = {}
+        self._filled = set()
+        self._file = tempfile.TemporaryFile(prefix='cid_spool_')
+        self.n_rows = 0
+
+    def append(self, df):
+        if self.dedupe:
+            df.columns = self.dedupe(df.columns)
+        seen = {}
+        idx = []
+        for c in df.columns:
+            key = (c, seen.get(c, 0))
+            seen[c] = key[1] + 1
+            if key not in self._pos:
+                self._pos[key] = len(self._keys)
+                self._keys.append(key)
+            idx.append(self._pos[key])
+        notna = df.notna().to_numpy()
+        if self.drop_empty:
+            self._filled.update(i for i, filled in zip(idx, notna.any(axis=0)) if filled)
+        values = df.to_numpy(dtype=object)
+        values[~notna] = None
+        rows = values.tolist()
+        pickle.dump((idx, rows), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.n_rows += len(rows)
+
+    def _kept(self):
+        if not self.drop_empty:
+            return list(range(len(self._keys)))
+        return [i for i in range(len(self._keys)) if i in self._filled]
+
+    @property
+    def columns(self):
+        cols = [self._keys[i][0] for i in self._kept()]
+        return self.dedupe(cols) if self.dedupe else cols
+
+    def rows(self):
+        '''
+        Relê o spool devolvendo cada linha alinhada à união final de colunas.
+        '''
+        width = len(self._keys)
+        kept = self._kept()
+        dropped = len(kept) < width
+        self._file.flush()
+        self._file.seek(0)
+        while True:
+            try:
+                idx, rows = pickle.load(self._file)
+            except EOFError:
+                break
+            for r in rows:
+                out = [None] * width
+                for i, v in zip(idx, r):
+                    out[i] = v
+                yield [out[i] for i in kept] if dropped else out
+        self._file.seek(0, os.SEEK_END)
+
+    def close(self):
+        self._file.close()
+
+
+class XlsxSink:
+    '''
+    Excel em modo write-only do openpyxl: memória constante por linha.
+    Datas do --compact viram células de data, mostradas como dd/mm/aaaa.
+    '''
+
+    def __init__(self, path, sheet_name='Compiled'):
+        self.path = path
+        self.sheet_name = sheet_name
+
+    def dump(self, columns, rows):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(self.sheet_name)
+        if columns:
+            ws.append(columns)
+        for r in rows:
+            ws.append([self._date_cell(ws, v) if isinstance(v, date) else v for v in r])
+        wb.save(self.path)
+
+    @staticmethod
+    def _date_cell(ws, value):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.number_format = 'DD/MM/YYYY'
+        return cell
+
+
+class ParquetSink:
+    '''
+    Parquet particionado em estilo hive: source_pdf=<arquivo>/ ou
+    run_date=<AAAA-MM-DD>/. A pasta de saída é recriada a cada execução,
+    exceto partições de outras datas quando partition_by='run_date';
+    update() troca só as partições dos documentos que mudaram.
+    '''
+
+    def __init__(self, path, partition_by='source_pdf', run_date=None):
+        if partition_by not in ('source_pdf', 'run_date'):
+            raise ValueError(f'partition_by inválido: {partition_by!r}')
+        self.path = path
+        self.partition_by = partition_by
+        self.run_date = run_date or date.today().isoformat()
+
+    def dump(self, columns, rows):
+        pa = _require_pyarrow()
+        import pyarrow.parquet as pq
+        if self.partition_by == 'run_date':
+            part_dir = os.path.join(self.path, f'run_date={self.run_date}')
+            shutil.rmtree(part_dir, ignore_errors=True)
+            os.makedirs(part_dir)
+            schema = _arrow_schema(pa, columns)
+            with pq.ParquetWriter(os.path.join(part_dir, 'part-0.parquet'), schema) as w:
+                for chunk in _batches(rows):
+                    w.write_batch(_arrow_batch(pa, schema, chunk))
+            return
+        shutil.rmtree(self.path, ignore_errors=True)
+        os.makedirs(self.path)
+        self._write_partitions(pa, pq, columns, rows)
+
+    def _write_partitions(self, pa, pq, columns, rows, schema_columns=None):
+        key = columns.index('source_pdf') if 'source_pdf' in columns else None
+        keep = [i for i in range(len(columns)) if i != key]
+        schema = _arrow_schema(pa, schema_columns or [columns[i] for i in keep])
+        writer = None
+        current = object()
+        try:
+            for chunk in _batches(rows):
+                run = []
+                for r in chunk:
+                    value = r[key] if key is not None else None
+                    if value != current:
+                        if run:
+                            writer.write_batch(_arrow_batch(pa, schema, run))
+                            run = []
+                        if writer:
+                            writer.close()
+                        writer = self._partition_writer(pq, schema, value)
+                        current = value
+                    run.append([r[i] for i in keep])
+                if run:
+                    writer.write_batch(_arrow_batch(pa, schema, run))
+        finally:
+            if writer:
+                writer.close()
+
+    def update(self, columns, rows, drop=()):
+        '''
+        Atualização sem reescrever a pasta (partition_by='source_pdf'):
+        apaga as partições dos documentos em drop e grava as dos que
+        chegaram, com o schema que a pasta já tem. Devolve False, sem mexer
+        em nada, se precisar de uma reconstrução completa (dump).
+        '''
+        if self.partition_by != 'source_pdf' or columns and 'source_pdf' not in columns:
+            return False
+        pa = _require_pyarrow()
+        import pyarrow.parquet as pq
+        parts = glob.glob(os.path.join(glob.escape(self.path), 'source_pdf=*', '*.parquet'))
+        if not parts:
+            return False
+        existing = ['source_pdf'] + pq.read_schema(parts[0]).names
+        idx = _align(columns, existing)
+        if idx is None:
+            return False
+        gone = {doc_id(d) for d in drop}
+        for part_dir in glob.glob(os.path.join(glob.escape(self.path), 'source_pdf=*')):
+            label = unquote(os.path.basename(part_dir).split('=', 1)[1])
+            if doc_id(label) in gone:
+                shutil.rmtree(part_dir)
+        self._write_partitions(pa, pq, unique_names(existing),
+                               _aligned_rows(rows, idx, len(existing)), existing[1:])
+        return True
+
+    def _partition_writer(self, pq, schema, value):
+        part_dir = os.path.join(self.path, f'source_pdf={quote(str(value), safe="")}')
+        os.makedirs(part_dir, exist_ok=True)
+        n = len(os.listdir(part_dir))
+        return pq.ParquetWriter(os.path.join(part_dir, f'part-{n}.parquet'), schema)
+
+
+class ArrowSink:
+    '''
+    Arquivo Arrow IPC (formato file), escrito em lotes.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+    def dump(self, columns, rows):
+        pa = _require_pyarrow()
+        schema = _arrow_schema(pa, columns)
+        with pa.OSFile(self.path, 'wb') as f, pa.ipc.new_file(f, schema) as w:
+            for chunk in _batches(rows):
+                w.write_batch(_arrow_batch(pa, schema, chunk))
+
+
+class CsvSink:
+    '''
+    CSV em UTF-8. Com chunk_rows, divide em <nome>.part0001.csv, ... todos
+    com o mesmo cabeçalho. As partes de execuções anteriores são apagadas
+    antes, para quem lê <nome>.part*.csv não pegar linhas repetidas.
+    '''
+
+    def __init__(self, path, chunk_rows=0):
+        self.path = path
+        self.chunk_rows = chunk_rows
+
+    def _open(self, n):
+        path = self.path
+        if self.chunk_rows:
+            stem, ext = os.path.splitext(self.path)
+            path = f'{stem}.part{n:04d}{ext}'
+        return open(path, 'w', newline='', encoding='utf-8')
+
+    def _remove_parts(self):
+        stem, ext = os.path.splitext(self.path)
+        for p in glob.glob(f'{glob.escape(stem)}.part*{glob.escape(ext)}'):
+            os.remove(p)
+
+    def dump(self, columns, rows):
+        self._remove_parts()
+        if not self.chunk_rows:
+            with self._open(0) as f:
+                w = csv.writer(f)
+                w.writerow(columns)
+                for chunk in _batches(rows):
+                    w.writerows(_text_rows(chunk))
+            return
+        for n, chunk in enumerate(_batches(rows, self.chunk_rows), start=1):
+            with self._open(n) as f:
+                w = csv.writer(f)
+                w.writerow(columns)
+                w.writerows(_text_rows(chunk))
+
+    def update(self, columns, rows, drop=()):
+        '''
+        Acrescenta as linhas no fim do arquivo, na ordem do cabeçalho que
+        ele já tem. CSV não apaga linhas: com drop, arquivo dividido em
+        partes ou coluna nova, devolve False (precisa de dump).
+        '''
+        if drop or self.chunk_rows or not os.path.exists(self.path):
+            return False
+        with open(self.path, newline='', encoding='utf-8') as f:
+            header = next(csv.reader(f), None)
+        idx = _align(columns, header) if header else None
+        if idx is None:
+            return False
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(_text_rows(_aligned_rows(rows, idx, len(header))))
+        return True
+
+
+def sql_name(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def sqlite_key(column):
+    '''
+    Chave de consulta de uma coluna ('sap_cofor', 'supplier'...) ou None.
+    Ignora o prefixo Table_N_M_ do vincente_test e o sufixo .N das
+    tabelas repetidas, e aceita as variantes de cabeçalho conhecidas.
+    '''
+    name = re.sub(r'^Table_\d+_\d+_', '', str(column))
+    name = re.sub(r'\.\d+$', '', name)
+    return SQLITE_KEYS.get(canonical_header(name.strip()))
+
+
+class SqliteSink:
+    '''
+    Banco SQLite consultável (veja pdf_query.py): uma tabela com as colunas
+    da saída, todas como texto, e índices nas colunas de SQLITE_KEYS.
+    Cada linha ganha doc_id, o PDF extraído sem as cópias do rótulo
+    source_pdf (pdf_dedupe.doc_id), que não muda quando o grupo de cópias
+    muda. dump() troca todo o conteúdo da tabela, como os outros sinks;
+    upsert() troca só as linhas dos documentos informados, por doc_id,
+    para quem pede explicitamente.
+    '''
+
+    def __init__(self, path, table=SQLITE_TABLE):
+        self.path = path
+        self.table = table
+
+    def _ensure_columns(self, conn, columns):
+        existing = [r[1] for r in conn.execute(f'PRAGMA table_info({sql_name(self.table)})')]
+        if not existing:
+            cols = ', '.join(f'{sql_name(c)} TEXT' for c in columns)
+            conn.execute(f'CREATE TABLE {sql_name(self.table)} ({cols})')
+        else:
+            for c in columns:
+                if c not in existing:
+                    conn.execute(f'ALTER TABLE {sql_name(self.table)} ADD COLUMN {sql_name(c)} TEXT')
+        for c in columns:
+            if sqlite_key(c) or c == 'doc_id':
+                index = f'ix_{self.table}_{re.sub(r"[^0-9A-Za-z]+", "_", c)}'
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {sql_name(index)} '
+                             f'ON {sql_name(self.table)} ({sql_name(c)})')
+
+    def _write(self, columns, rows, replace_all, drop=()):
+        if 'source_pdf' not in columns:
+            if drop and not replace_all:
+                # nada para inserir, só linhas para tirar
+                columns, rows = ['source_pdf'], ()
+            else:
+                return
+        columns = unique_names(columns) + ['doc_id']
+        key = columns.index('source_pdf')
+        insert = (f'INSERT INTO {sql_name(self.table)} ({", ".join(sql_name(c) for c in columns)}) '
+                  f'VALUES ({", ".join("?" * len(columns))})')
+        delete = f'DELETE FROM {sql_name(self.table)} WHERE doc_id = ?'
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            # uma transação só: quem consulta vê o banco antigo ou o novo, nunca pela metade
+            with conn:
+                self._ensure_columns(conn, columns)
+                if replace_all:
+                    conn.execute(f'DELETE FROM {sql_name(self.table)}')
+                seen = {doc_id(d) for d in drop}
+                for doc in seen:
+                    conn.execute(delete, (doc,))
+                for chunk in _batches(rows):
+                    values = [[_text_value(v) for v in r] + [doc_id(r[key])]
+                              for r in chunk]
+                    if not replace_all:
+                        for doc in {r[-1] for r in values} - seen:
+                            conn.execute(delete, (doc,))
+                            seen.add(doc)
+                    conn.executemany(insert, values)
+        finally:
+            conn.close()
+
+    def dump(self, columns, rows):
+        self._write(columns, rows, replace_all=True)
+
+    def upsert(self, columns, rows, drop=()):
+        '''
+        Troca as linhas de cada documento presente em rows e apaga as dos
+        documentos em drop (nomes de PDF ou rótulos source_pdf: PDFs
+        removidos ou cujo rótulo mudou); o resto da tabela fica.
+        '''
+        self._write(columns, rows, replace_all=False, drop=drop)
+
+    def update(self, columns, rows, drop=()):
+        if not os.path.exists(self.path):
+            return False
+        self.upsert(columns, rows, drop)
+        return True
+
+
+def build_sinks(formats, out_stem, partition_by='source_pdf', csv_chunk_rows=0):
+    '''
+    Monta os sinks pedidos; todos recebem as mesmas colunas do spool.
+    '''
+    sinks = []
+    for fmt in formats:
+        if fmt == 'xlsx':
+            sinks.append(XlsxSink(f'{out_stem}.xlsx'))
+        elif fmt == 'parquet':
+            sinks.append(ParquetSink(f'{out_stem}_parquet', partition_by=partition_by))
+        elif fmt == 'arrow':
+            sinks.append(ArrowSink(f'{out_stem}.arrow'))
+        elif fmt == 'csv':
+            sinks.append(CsvSink(f'{out_stem}.csv', chunk_rows=csv_chunk_rows))
+        elif fmt == 'sqlite':
+            sinks.append(SqliteSink(f'{out_stem}.sqlite'))
+        else:
+            raise ValueError(f'formato desconhecido: {fmt!r}')
+    return sinks
+
+
+class Output:
+    '''
+    Recebe um DataFrame por PDF, joga no spool e, no close(), despeja
+    o spool em cada sink.
+    '''
+
+    def __init__(self, sinks, dedupe=None, drop_empty=False):
+        self.sinks = sinks
+        self.spool = RowSpool(dedupe, drop_empty=drop_empty)
+
+    def write(self, df):
+        if not df.empty:
+            self.spool.append(df)
+
+    def close(self):
+        try:
+            for sink in self.sinks:
+                sink.dump(self.spool.columns, self.spool.rows())
+        finally:
+            self.spool.close()
+
+    def update(self, drop=()):
+        '''
+        Aplica o spool como atualização (sink.update) em vez de reescrever
+        as saídas: drop são os documentos cujas linhas antigas saem.
+        Devolve os sinks que não sabem se atualizar e precisam de dump.
+        '''
+        try:
+            return [sink for sink in self.sinks
+                    if not (hasattr(sink, 'update')
+                            and sink.update(self.spool.columns, self.spool.rows(), drop))]
+        finally:
+            self.spool.close()
+
+    def discard(self):
+        '''
+        Abandona o spool sem gravar nada (execução interrompida).
+        '''
+        self.spool.close()
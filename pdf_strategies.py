@@ -0,0 +1,62 @@
+import copy
+import importlib
+from collections import namedtuple
+
+
+Strategy = namedtuple('Strategy', ['name', 'compile_tables', 'dedupe', 'version'],
+                      defaults=(None,))
+
+# estratégias que vêm com o repositório: nome -> módulo com compile_tables
+# (e deduplicate_columns, quando o leitor renomeia colunas repetidas)
+BUILTIN = {
+    'igor_done': 'pdf_reader_igor_done',
+    'igor_test': 'pdf_reader_igor_test',
+    'vincente_test': 'pdf_reader_vincente_test',
+}
+
+_registry = {}
+
+
+def register(name, compile_tables, dedupe=None, version=None):
+    '''
+    Registra uma estratégia de compilação. compile_tables(tables) -> DataFrame;
+    dedupe(cols) é aplicado às colunas da saída dela, como no run_main (pdf_cli).
+    version, se informado, identifica a estratégia nos checkpoints no lugar
+    do hash do código (necessário para lambdas e funções sem fonte).
+    '''
+    _registry[name] = Strategy(name, compile_tables, dedupe, version)
+
+
+def available():
+    return sorted(set(BUILTIN) | set(_registry))
+
+
+def get_strategy(name):
+    if name not in _registry and name in BUILTIN:
+        mod = importlib.import_module(BUILTIN[name])
+        register(name, mod.compile_tables, getattr(mod, 'deduplicate_columns', None))
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError(f'Unknown strategy {name!r}; available: {", ".join(available())}') from None
+
+
+def resolve(spec):
+    '''
+    'a,b' ou 'all' -> lista de Strategy, na ordem pedida.
+    '''
+    names = available() if spec.strip() == 'all' else [s.strip() for s in spec.split(',') if s.strip()]
+    return [get_strategy(n) for n in dict.fromkeys(names)]
+
+
+def compile_strategies(tables, strategies):
+    '''
+    Roda cada estratégia sobre as mesmas tabelas extraídas e devolve
+    {nome: DataFrame}. Cada uma recebe sua própria cópia das tabelas,
+    porque algumas (igor_test) alteram a lista recebida.
+    '''
+    out = {}
+    for i, st in enumerate(strategies):
+        last = i == len(strategies) - 1
+        out[st.name] = st.compile_tables(tables if last else copy.deepcopy(tables))
+    return out
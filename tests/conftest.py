@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+from pdf_headers import configure  # noqa: E402
+from synthetic_cid import generate_corpus  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def header_rules():
+    configure()
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    '''
+    pdf_reader/ com 4 PDFs CID sintéticos (SAP/COFOR 1000..1003) e spare/
+    com 6 de outro seed, para acrescentar ou trocar. Roda dentro de
+    tmp_path, como a linha de comando roda na pasta dos PDFs.
+    '''
+    monkeypatch.chdir(tmp_path)
+    generate_corpus('pdf_reader', n_docs=4, pages=(1, 1), seed=0)
+    generate_corpus('spare', n_docs=6, pages=(1, 1), seed=1)
+    return 'pdf_reader'
@@ -0,0 +1,88 @@
+import csv
+import os
+import shutil
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from pdf_manifest import Manifest
+from pdf_pipeline import Pipeline
+from pdf_reader_igor_test import compile_tables, deduplicate_columns
+from pdf_sinks import SQLITE_TABLE, build_sinks
+
+ds = pytest.importorskip('pyarrow.dataset')
+
+
+def _run(corpus, append):
+    pipe = Pipeline(compile_tables, dedupe=deduplicate_columns)
+    manifest = Manifest('manifest.json', 'parts', 'test')
+    sinks = build_sinks(['xlsx', 'csv', 'sqlite', 'parquet'], 'out')
+    assert pipe.run_incremental(corpus, sinks, manifest, append=append) == []
+    return manifest
+
+
+def _rows(frame, columns):
+    frame = frame[columns].fillna('').astype(str)
+    return sorted(frame.itertuples(index=False, name=None))
+
+
+def _outputs():
+    '''
+    Linhas de cada saída, com as colunas do XLSX, como tuplas de texto ordenadas.
+    '''
+    xlsx = pd.read_excel('out.xlsx', dtype=str)
+    columns = list(xlsx.columns)
+    with open('out.csv', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        text = pd.DataFrame(list(reader), columns=header)
+    with sqlite3.connect('out.sqlite') as conn:
+        table = pd.read_sql(f'SELECT * FROM {SQLITE_TABLE}', conn)
+    parquet = ds.dataset('out_parquet', format='parquet', partitioning='hive').to_table()
+    return {
+        'xlsx': _rows(xlsx, columns),
+        'csv': _rows(text, columns),
+        'sqlite': _rows(table, columns),
+        'parquet': _rows(parquet.to_pandas(), columns),
+    }
+
+
+def _pdfs(rows):
+    return {r[0] for r in rows}
+
+
+def test_append_then_rebuild_keeps_sinks_consistent(corpus, capsys):
+    manifest = _run(corpus, append=False)
+    first = _outputs()
+    assert all(rows == first['xlsx'] for rows in first.values())
+
+    # PDF novo: CSV, SQLite e Parquet recebem as linhas; o XLSX fica para depois
+    shutil.copy('spare/cid_0004.pdf', os.path.join(corpus, 'cid_0004.pdf'))
+    manifest = _run(corpus, append=True)
+    assert manifest.stale == ['out.xlsx']
+    got = _outputs()
+    assert 'cid_0004.pdf' not in _pdfs(got['xlsx'])
+    for fmt in ('csv', 'sqlite', 'parquet'):
+        assert 'cid_0004.pdf' in _pdfs(got[fmt])
+        assert got[fmt] == got['csv']
+
+    # PDF trocado: as linhas antigas saem, e o CSV não sabe tirar linhas
+    shutil.copy('spare/cid_0005.pdf', os.path.join(corpus, 'cid_0001.pdf'))
+    manifest = _run(corpus, append=True)
+    assert manifest.stale == ['out.csv', 'out.xlsx']
+    got = _outputs()
+    assert got['sqlite'] == got['parquet']
+    cofor = {r[0]: r[2] for r in got['sqlite']}
+    assert cofor['cid_0001.pdf'] == '1005'
+
+    # sem append, só as saídas atrasadas são refeitas e tudo volta a bater
+    capsys.readouterr()
+    manifest = _run(corpus, append=False)
+    assert manifest.stale == []
+    saved = [line for line in capsys.readouterr().out.splitlines() if line.startswith('Data saved')]
+    assert saved == ['Data saved to out.xlsx', 'Data saved to out.csv']
+    final = _outputs()
+    assert all(rows == final['sqlite'] for rows in final.values())
+    assert _pdfs(final['xlsx']) == {f'cid_{d:04d}.pdf' for d in range(5)}
+    assert Manifest('manifest.json', 'parts', 'test').stale == []
@@ -0,0 +1,52 @@
+import os
+import shutil
+
+import pandas as pd
+
+from pdf_manifest import Manifest
+from pdf_pipeline import Pipeline
+from pdf_reader_igor_test import compile_tables, deduplicate_columns
+from pdf_sinks import build_sinks
+
+
+def _run(corpus, **opts):
+    pipe = Pipeline(compile_tables, dedupe=deduplicate_columns)
+    manifest = Manifest('manifest.json', 'parts', 'test')
+    failed = pipe.run_incremental(corpus, build_sinks(['csv'], 'out'), manifest, **opts)
+    assert failed == []
+    return manifest
+
+
+def _cofor_by_pdf():
+    df = pd.read_csv('out.csv', dtype=str)
+    return df.groupby('source_pdf')['SAP/COFOR'].agg(lambda s: sorted(set(s))).to_dict()
+
+
+def test_delete_removes_rows_and_part(corpus):
+    manifest = _run(corpus)
+    assert _cofor_by_pdf() == {f'cid_{d:04d}.pdf': [str(1000 + d)] for d in range(4)}
+    gone = os.path.join(corpus, 'cid_0002.pdf')
+    part = manifest.files[gone]['part']
+    os.remove(gone)
+
+    manifest = _run(corpus)
+    assert gone not in manifest.files
+    assert not os.path.exists(part)
+    assert 'cid_0002.pdf' not in _cofor_by_pdf()
+
+
+def test_replace_recompiles_only_that_pdf(corpus, capsys):
+    _run(corpus)
+    capsys.readouterr()
+    shutil.copy('spare/cid_0005.pdf', os.path.join(corpus, 'cid_0001.pdf'))
+
+    _run(corpus)
+    out = capsys.readouterr().out
+    assert 'Processing pdf_reader/cid_0001.pdf' in out
+    assert 'cid_0000.pdf' not in out
+    got = _cofor_by_pdf()
+    assert got['cid_0001.pdf'] == ['1005']
+    assert got['cid_0000.pdf'] == ['1000']
+
+    _run(corpus)
+    assert 'No changes' in capsys.readouterr().out
@@ -0,0 +1,89 @@
+import os
+import time
+import itertools
+import subprocess
+
+from pdf_metrics import rss_mb
+from pdf_pool import SupervisedPool, TaskFailure
+
+
+def _task(item):
+    kind, arg = item
+    if kind == 'ok':
+        return arg * 2
+    if kind == 'hang':
+        time.sleep(60)
+    if kind == 'crash':
+        os._exit(3)
+    if kind == 'raise':
+        raise ValueError(arg)
+    if kind == 'memory':
+        hog = b'x' * (arg << 20)
+        time.sleep(60)
+        return len(hog)
+    if kind == 'child':
+        # como o --page-workers: o worker abre um processo e fica esperando
+        proc = subprocess.Popen(['sleep', '60'])
+        with open(arg, 'w') as f:
+            f.write(str(proc.pid))
+        proc.wait()
+    raise AssertionError(kind)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    with open(f'/proc/{pid}/stat') as f:
+        return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+
+
+def test_failures_are_isolated_and_in_order():
+    items = [('ok', 1), ('hang', None), ('ok', 2), ('crash', None), ('raise', 'bad'), ('ok', 3)]
+    with SupervisedPool(_task, workers=2, timeout=2) as pool:
+        results = list(pool.imap(items))
+    assert [item for item, _ in results] == items
+    out = [res for _, res in results]
+    assert out[0] == 2 and out[2] == 4 and out[5] == 6
+    assert isinstance(out[1], TaskFailure) and out[1].reason == 'timeout'
+    assert isinstance(out[3], TaskFailure) and out[3].reason == 'crash'
+    assert 'exit code 3' in str(out[3])
+    assert isinstance(out[4], TaskFailure) and 'ValueError: bad' in str(out[4])
+
+
+def test_memory_limit_kills_only_that_item():
+    limit = int(rss_mb(os.getpid())) + 150
+    items = [('memory', 400), ('ok', 5)]
+    started = time.monotonic()
+    with SupervisedPool(_task, workers=1, timeout=30, max_memory_mb=limit) as pool:
+        out = [res for _, res in pool.imap(items)]
+    assert isinstance(out[0], TaskFailure) and out[0].reason == 'memory'
+    assert out[1] == 10
+    assert time.monotonic() - started < 20
+
+
+def test_timeout_kills_processes_opened_by_the_worker(tmp_path):
+    pid_file = tmp_path / 'child.pid'
+    with SupervisedPool(_task, workers=1, timeout=1) as pool:
+        (_, res), = pool.imap([('child', str(pid_file))])
+    assert isinstance(res, TaskFailure) and res.reason == 'timeout'
+    child = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while _alive(child) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert not _alive(child)
+
+
+def test_imap_reads_unbounded_input_lazily():
+    pulled = []
+
+    def source():
+        for i in itertools.count():
+            pulled.append(i)
+            yield ('ok', i)
+
+    with SupervisedPool(_task, workers=2) as pool:
+        first = list(itertools.islice(pool.imap(source()), 5))
+    assert [res for _, res in first] == [0, 2, 4, 6, 8]
+    assert len(pulled) <= 5 + 2 * 2 + 1